@@ -0,0 +1,47 @@
+"""Private qiskit-terra APIs used by ``multi_transpile``.
+
+Written against qiskit-terra 0.16 (qiskit 0.23.x). These internals are not
+part of the public API, so this is the one module to update when they move.
+"""
+from qiskit.converters import dag_to_circuit
+from qiskit.dagcircuit import DAGCircuit
+
+
+def map_condition(bit_map, condition):
+    """``condition`` of an instruction with its clbits remapped by ``bit_map``.
+
+    Args:
+        bit_map (dict): old bit -> new bit
+        condition (tuple or None): (ClassicalRegister, int)
+
+    Returns:
+        tuple or None: condition on the register of the new clbits
+    """
+    return DAGCircuit._map_condition(bit_map, condition)
+
+
+def run_on_dag(pass_manager, dag):
+    """Run ``pass_manager`` on ``dag``, like ``PassManager.run`` on a circuit.
+
+    ``RunningPassManager.run`` takes a circuit and converts it to a DAG
+    first, so its pass loop is repeated here on the DAG itself.
+
+    Args:
+        pass_manager (PassManager): passes to run
+        dag (DAGCircuit): input DAG, transformed in place by the passes
+
+    Returns:
+        QuantumCircuit: the output circuit, with ``_layout`` set and named after ``dag``
+    """
+    name = dag.name
+    running_passmanager = pass_manager._create_running_passmanager()
+    for passset in running_passmanager.working_list:
+        for pass_ in passset:
+            dag = running_passmanager._do_pass(pass_, dag, passset.options)
+
+    circuit = dag_to_circuit(dag)
+    if name:
+        circuit.name = name
+    circuit._layout = running_passmanager.property_set['layout']
+    pass_manager.property_set = running_passmanager.property_set
+    return circuit
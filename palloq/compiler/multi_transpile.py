@@ -12,7 +12,7 @@ from qiskit.providers.ibmq.ibmqbackend import IBMQSimulator, IBMQBackend
 from qiskit import user_config
 from qiskit.circuit.quantumcircuit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit.circuit.quantumregister import Qubit
-from qiskit.converters import isinstanceint, isinstancelist, dag_to_circuit, circuit_to_dag
+from qiskit.converters import isinstanceint, isinstancelist, dag_to_circuit
 from qiskit.dagcircuit import DAGCircuit
 from qiskit.providers import BaseBackend
 from qiskit.providers.backend import Backend
@@ -34,6 +34,8 @@ from qiskit.transpiler.preset_passmanagers import (level_0_pass_manager,
 from qiskit.compiler import transpile
 # from .transpile import transpile
 from palloq import multi_pass_manager
+from palloq.transpiler import CrosstalkModel
+from palloq.compiler._terra_compat import map_condition, run_on_dag
 
 
 logger = logging.getLogger(__name__)
@@ -57,7 +59,14 @@ def multi_transpile(circuits: Union[List[QuantumCircuit], List[List[QuantumCircu
                     callback: Optional[Callable[[BasePass, DAGCircuit, float,
                                                 PropertySet, int], Any]] = None,
                     output_name: Optional[Union[str, List[str]]] = None, 
-                    xtalk_prop: Optional[Dict[Tuple[int], Dict[Tuple[int], int]]] = None):
+                    xtalk_prop: Optional[Union[Dict[Tuple[int], Dict[Tuple[int], int]], CrosstalkModel]] = None,
+                    layout_starts: int = 1,
+                    layout_time_budget: Optional[float] = None,
+                    layout_vf2_max_qubits: int = 0,
+                    layout_iterations: int = 10000,
+                    schedule_alignment: Optional[str] = None,
+                    dd_sequence: Optional[str] = None,
+                    dd_min_duration: Union[int, float] = 0):
     """Mapping several circuits to single circuit based on calibration for the backend
 
     Args:
@@ -65,6 +74,21 @@ def multi_transpile(circuits: Union[List[QuantumCircuit], List[List[QuantumCircu
         backend:
         backend_properties:
         output_name: the name of output circuit. str or List[str]
+        xtalk_prop: crosstalk table {(i, j): {(k, l): ratio}} for the xtalk_adaptive,
+            xtalk_region and xtalk_annealing layouts and the xtalk_alap and xtalk_asap
+            schedulings
+        layout_starts: number of greedy variants tried by the xtalk_adaptive layout
+        layout_time_budget: wall-clock seconds for those variants, or for the annealing
+            of the xtalk_annealing layout, per circuit
+        layout_vf2_max_qubits: programs up to this size are placed without SWAPs when
+            their graph fits the free coupling graph
+        layout_iterations: moves tried by the xtalk_annealing layout
+        schedule_alignment: alignment of every program in the scheduled circuit, 'start',
+            'end' or 'center'. None schedules the whole batch as late (alap) or as soon
+            (asap) as possible.
+        dd_sequence: dynamical decoupling sequence of u3 pulses, 'XX' or 'XY4', inserted
+            into the idle gaps of the scheduled circuit. None keeps the delays.
+        dd_min_duration: idle gaps up to this duration keep their delay
 
     Returns:
         composed multitasking circuit(s)..
@@ -74,7 +98,7 @@ def multi_transpile(circuits: Union[List[QuantumCircuit], List[List[QuantumCircu
 
 
     # combine circuits in parallel
-    multi_circuits = list(map(_compose_multicircuits, circuits, output_name_list))
+    multi_dags = list(map(_compose_multidag, circuits, output_name_list))
 
 
     backend_properties = _backend_properties(backend_properties, backend)
@@ -96,24 +120,36 @@ def multi_transpile(circuits: Union[List[QuantumCircuit], List[List[QuantumCircu
 
     elif optimization_level and not pass_manager:
         logger.info("############## qiskit transpile optimization level "+str(optimization_level)+" ##############")
-    elif layout_method == 'xtalk_adaptive':
-        pass_manager = multi_pass_manager(pass_manager_config, xtalk_prop)
+    elif layout_method in {'xtalk_adaptive', 'xtalk_region', 'xtalk_annealing'}:
+        # compile the crosstalk table once and share it with every pass
+        pass_manager = multi_pass_manager(pass_manager_config, CrosstalkModel.from_prop(xtalk_prop),
+                                          layout_starts=layout_starts,
+                                          layout_time_budget=layout_time_budget,
+                                          layout_vf2_max_qubits=layout_vf2_max_qubits,
+                                          layout_iterations=layout_iterations,
+                                          schedule_alignment=schedule_alignment,
+                                          dd_sequence=dd_sequence,
+                                          dd_min_duration=dd_min_duration)
         # layout_method=None
         logger.info("############## xtalk-adaptive multi transpile ##############")
-        transpiled_multi_circuits = list(map(pass_manager.run, multi_circuits))
+        transpiled_multi_circuits = [run_on_dag(pass_manager, dag) for dag in multi_dags]
         if len(transpiled_multi_circuits) == 1: 
             return transpiled_multi_circuits[0]
         return transpiled_multi_circuits
     else:
-        pass_manager = multi_pass_manager(pass_manager_config)
+        pass_manager = multi_pass_manager(pass_manager_config, CrosstalkModel.from_prop(xtalk_prop),
+                                          schedule_alignment=schedule_alignment,
+                                          dd_sequence=dd_sequence,
+                                          dd_min_duration=dd_min_duration)
         logger.info("############## multi transpile ##############")
         
-        transpiled_multi_circuits = list(map(pass_manager.run, multi_circuits))
+        transpiled_multi_circuits = [run_on_dag(pass_manager, dag) for dag in multi_dags]
         if len(transpiled_multi_circuits) == 1: 
             return transpiled_multi_circuits[0]
         return transpiled_multi_circuits
 
     # transpile multi_circuit(s)
+    multi_circuits = list(map(dag_to_circuit, multi_dags))
     transpied_circuit = transpile(
                             circuits=multi_circuits, backend=backend, basis_gates=basis_gates, coupling_map=coupling_map, 
                             backend_properties=backend_properties, initial_layout=initial_layout, 
@@ -126,71 +162,44 @@ def multi_transpile(circuits: Union[List[QuantumCircuit], List[List[QuantumCircu
     return transpied_circuit
 
 
-def _compose_multicircuits(circuits: List[QuantumCircuit], output_name) -> QuantumCircuit:
+def _compose_multidag(circuits: List[QuantumCircuit], output_name=None) -> DAGCircuit:
+    """Compose ``circuits`` side by side into one DAG.
 
-    """FIXME!
-    入力の量子回路の量子ビット数合計がbackendの量子ビット数を超える場合のErrorを作る
-
-        if sum([circuit.num_qubit for circuit in circuits]) > num_qubit:
-            raise
-    """
-
-    composed_multicircuit = QuantumCircuit(name=output_name)
-    name_list = []
-    bit_counter = 0
-    dag_list = [circuit_to_dag(circuit.copy()) for circuit in circuits]
-    return dag_to_circuit(_compose_dag(dag_list))
-
-
-def _compose_dag(dag_list):
-    """Compose each dag and return new multitask dag"""
+    Every program gets a quantum register of its own, named after its first
+    register, and a classical register for its clbits. The instructions are
+    appended straight to the composed DAG with their bits remapped, copying
+    each instruction once, without intermediate circuits or DAGs.
 
-    """FIXME 下記と同様
+    FIXME!
+    入力の量子回路の量子ビット数合計がbackendの量子ビット数を超える場合のErrorを作る
     """
-    name_list = []
-    #################
-    qubit_counter = 0
-    clbit_counter = 0
     composed_multidag = DAGCircuit()
-    for i, dag in enumerate(dag_list):
-        num_qubits = dag.num_qubits()
-        num_clbits = dag.num_clbits()
-        """FIXME
-        Problem:
-            register_name: register nameを定義すると、outputの `new_dag` に対して `dag_to_circuit()`
-            を実行した時、
-            qiskit.circuit.exceptions.CircuitError: 'register name "定義した名前" already exists'
-            が発生するため、任意のレジスター名をつけることができない
-
-        Code:
-            reg_name_tmp = dag.qubits[0].register.name
-            register_name = reg_name_tmp if (reg_name_tmp not in name_list) and (
-                not reg_name_tmp == 'q') else None
-            name_list.append(register_name)
-        """
-        ############################################################
-        reg_name_tmp = dag.qubits[0].register.name
+    composed_multidag.name = output_name
+    name_list = []
+    for circuit in circuits:
+        # a register name that is already used or is the default 'q' raises
+        # 'register name already exists' in dag_to_circuit, so it gets a fresh name
+        reg_name_tmp = circuit.qubits[0].register.name
         register_name = reg_name_tmp if (reg_name_tmp not in name_list) and (not reg_name_tmp == 'q') else None
         name_list.append(register_name)
-        ############################################################
 
-        qr = QuantumRegister(size=num_qubits, name=register_name)
+        qr = QuantumRegister(size=circuit.num_qubits, name=register_name)
         composed_multidag.add_qreg(qr)
-        qubits = composed_multidag.qubits[qubit_counter : qubit_counter + num_qubits]
-
-        if num_clbits > 0: 
-            cr = ClassicalRegister(size=num_clbits, name=None)
+        bit_map = dict(zip(circuit.qubits, qr))
+        if circuit.num_clbits > 0:
+            cr = ClassicalRegister(size=circuit.num_clbits, name=None)
             composed_multidag.add_creg(cr)
-            clbits = composed_multidag.clbits[clbit_counter : clbit_counter + num_clbits]
-
-            composed_multidag.compose(dag, qubits=qubits, clbits=clbits)
-        else: 
-            composed_multidag.compose(dag, qubits=qubits)
-
-        qubit_counter += num_qubits
-        clbit_counter += num_clbits
+            bit_map.update(zip(circuit.clbits, cr))
+
+        composed_multidag.global_phase += circuit.global_phase
+        for instruction, qargs, cargs in circuit.data:
+            op = instruction.copy()
+            op.condition = map_condition(bit_map, instruction.condition)
+            composed_multidag.apply_operation_back(op, [bit_map[q] for q in qargs],
+                                                   [bit_map[c] for c in cargs])
     return composed_multidag
 
+
 def _backend_properties(backend_properties, backend):
     if backend_properties is None: 
         if backend: 
@@ -1 +1,2 @@
-from .preset_passmanagers import multi_pass_manager
\ No newline at end of file
+from .preset_passmanagers import multi_pass_manager
+from .crosstalk_model import CrosstalkModel
\ No newline at end of file
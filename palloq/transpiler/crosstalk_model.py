@@ -0,0 +1,122 @@
+"""Crosstalk table compiled for the multi-programming passes."""
+import hashlib
+
+import numpy as np
+
+
+def _sorted_edge(edge):
+    return (min(edge[0], edge[1]), max(edge[0], edge[1]))
+
+
+def _csr(keys, values, ratios, num_rows):
+    """Group ``values``/``ratios`` by ``keys`` into (ptr, idx, ratio) arrays."""
+    order = np.argsort(keys, kind="stable")
+    ptr = np.zeros(num_rows + 1, dtype=int)
+    np.add.at(ptr, np.asarray(keys, dtype=int) + 1, 1)
+    ptr = np.cumsum(ptr)
+    idx = np.asarray(values, dtype=int)[order]
+    ratio = np.asarray(ratios, dtype=float)[order]
+    for array in (ptr, idx, ratio):
+        array.setflags(write=False)
+    return ptr, idx, ratio
+
+
+class CrosstalkModel:
+    """Immutable crosstalk table shared by multi_transpile and its passes.
+
+    The input is the ``xtalk_prop`` dict of ``multi_transpile``:
+    ``{(i, j): {(k, l): ratio}}`` means that a CNOT on (i, j) multiplies the
+    error of a simultaneous CNOT on (k, l) by ``ratio``. Edge directions are
+    ignored. When both directions of a pair are given, the larger ratio is used
+    for both (``max_ratios``).
+
+    Edges are numbered in ``edges``. For every edge the model keeps, as CSR
+    arrays, the edges it affects (``affects_*``) and the edges that affect it
+    (``affected_by_*``) together with the symmetric max ratio.
+    """
+
+    def __init__(self, crosstalk_prop=None):
+        """
+        Args:
+            crosstalk_prop (dict): crosstalk table {(i, j): {(k, l): ratio}}
+        """
+        table = {}
+        for _edge, xtalk_dict in (crosstalk_prop or {}).items():
+            table[_sorted_edge(_edge)] = {
+                _sorted_edge(_xtalk_edge): xtalk_ratio
+                for _xtalk_edge, xtalk_ratio in xtalk_dict.items()
+            }
+        self._table = table
+
+        edges = sorted(set(table) | {e for xtalk in table.values() for e in xtalk})
+        self._edge_ids = {edge: i for i, edge in enumerate(edges)}
+        self.edges = np.array(edges, dtype=int).reshape(-1, 2)
+        self.edges.setflags(write=False)
+
+        sources, targets, max_ratios = [], [], []
+        for edge, xtalk_dict in table.items():
+            for xtalk_edge, xtalk_ratio in xtalk_dict.items():
+                reverse_ratio = table.get(xtalk_edge, {}).get(edge)
+                if reverse_ratio is not None:
+                    xtalk_ratio = max(reverse_ratio, xtalk_ratio)
+                sources.append(self._edge_ids[edge])
+                targets.append(self._edge_ids[xtalk_edge])
+                max_ratios.append(xtalk_ratio)
+        self.affects_ptr, self.affects_idx, self.affects_ratio = _csr(
+            sources, targets, max_ratios, len(edges)
+        )
+        (
+            self.affected_by_ptr,
+            self.affected_by_idx,
+            self.affected_by_ratio,
+        ) = _csr(targets, sources, max_ratios, len(edges))
+
+        self.fingerprint = hashlib.sha256(
+            repr(sorted((e, sorted(x.items())) for e, x in table.items())).encode()
+        ).hexdigest()
+
+    @classmethod
+    def from_prop(cls, crosstalk_prop):
+        """Return ``crosstalk_prop`` if it is already a model, otherwise compile it."""
+        if isinstance(crosstalk_prop, cls):
+            return crosstalk_prop
+        return cls(crosstalk_prop)
+
+    def __bool__(self):
+        return bool(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def edge_id(self, edge):
+        """Index of ``edge`` in ``edges``, or None if it has no crosstalk entry."""
+        return self._edge_ids.get(_sorted_edge(edge))
+
+    def is_source(self, edge):
+        """True if ``edge`` has its own entry in the crosstalk table."""
+        return _sorted_edge(edge) in self._table
+
+    def ratio(self, edge, xtalk_edge):
+        """Ratio given for ``edge`` acting on ``xtalk_edge``, or None."""
+        return self._table.get(_sorted_edge(edge), {}).get(_sorted_edge(xtalk_edge))
+
+    def affected_edges(self, edge):
+        """Edges affected by a CNOT on ``edge`` and their symmetric max ratios."""
+        return self._row(edge, self.affects_ptr, self.affects_idx, self.affects_ratio)
+
+    def affecting_edges(self, edge):
+        """Edges whose CNOTs affect ``edge`` and their symmetric max ratios."""
+        return self._row(
+            edge, self.affected_by_ptr, self.affected_by_idx, self.affected_by_ratio
+        )
+
+    def to_dict(self):
+        """The crosstalk table with sorted edge keys."""
+        return {edge: dict(xtalk) for edge, xtalk in self._table.items()}
+
+    def _row(self, edge, ptr, idx, ratio):
+        eid = self.edge_id(edge)
+        if eid is None:
+            return [], np.zeros(0)
+        start, stop = ptr[eid], ptr[eid + 1]
+        return [tuple(e) for e in self.edges[idx[start:stop]].tolist()], ratio[start:stop]
@@ -1,2 +1,6 @@
 from .layout import CrosstalkAdaptiveMultiLayout
-from .schedule import MultiALAPSchedule
\ No newline at end of file
+from .layout import RegionPartitionedMultiLayout
+from .layout import AnnealingLayoutRefinement
+from .schedule import MultiALAPSchedule
+from .schedule import MultiASAPSchedule
+from .schedule import MultiDynamicalDecoupling
@@ -1 +1,4 @@
 from .crosstalk_adaptive_layout import CrosstalkAdaptiveMultiLayout
+from .crosstalk_adaptive_layout import CrosstalkAdaptiveContext
+from .region_partition_layout import RegionPartitionedMultiLayout
+from .layout_annealing import AnnealingLayoutRefinement
@@ -0,0 +1,113 @@
+"""Cache of preprocessed backend tables keyed by calibration content."""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def calibration_hash(backend_prop, crosstalk_model=None):
+    """Content hash of the calibration data used by the layout tables.
+
+    Args:
+        backend_prop (BackendProperties): backend calibration
+        crosstalk_model (CrosstalkModel): crosstalk table
+
+    Returns:
+        str: hex digest that changes whenever a gate, qubit or crosstalk entry does
+    """
+    items = []
+    for ginfo in backend_prop.gates:
+        items.append(
+            (ginfo.gate, tuple(ginfo.qubits), tuple((p.name, p.value) for p in ginfo.parameters))
+        )
+    for q in backend_prop.qubits:
+        items.append(tuple((nduv.name, nduv.value) for nduv in q))
+    if crosstalk_model:
+        items.append(crosstalk_model.fingerprint)
+    return hashlib.sha256(repr(items).encode()).hexdigest()
+
+
+class BackendTableCache:
+    """LRU cache of backend tables with an optional ``.npz`` store on disk.
+
+    Tables are dicts of NumPy arrays. ``get`` always returns copies, so callers
+    may update them in place without touching the cached entry.
+    """
+
+    def __init__(self, maxsize=16, cache_dir=None):
+        """
+        Args:
+            maxsize (int): number of calibrations kept in memory
+            cache_dir (str): directory for the on-disk store, or None for memory only
+        """
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the tables for ``key``, or None on a miss."""
+        with self._lock:
+            tables = self._tables.get(key)
+            if tables is not None:
+                self._tables.move_to_end(key)
+        if tables is None:
+            tables = self._load(key)
+            if tables is not None:
+                self._remember(key, tables)
+        with self._lock:
+            if tables is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {name: array.copy() for name, array in tables.items()}
+
+    def put(self, key, tables):
+        """Store a copy of ``tables`` under ``key`` in memory and on disk."""
+        tables = {name: np.array(array, copy=True) for name, array in tables.items()}
+        self._remember(key, tables)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write then rename so concurrent readers never see a partial file
+            tmp_path = "{}.{}.tmp".format(self._path(key), os.getpid())
+            with open(tmp_path, "wb") as tmp_file:
+                np.savez(tmp_file, **tables)
+            os.replace(tmp_path, self._path(key))
+
+    def clear(self):
+        """Drop the in-memory entries. Files on disk are kept."""
+        with self._lock:
+            self._tables.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _remember(self, key, tables):
+        with self._lock:
+            self._tables[key] = tables
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _load(self, key):
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with np.load(self._path(key)) as npz:
+                return {name: npz[name] for name in npz.files}
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable backend table cache %s", self._path(key))
+            return None
+
+
+# shared by every layout pass that is not given its own cache
+backend_table_cache = BackendTableCache()
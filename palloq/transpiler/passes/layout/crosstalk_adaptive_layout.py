@@ -1,39 +1,217 @@
+import heapq
 import math
+import multiprocessing
+import threading
+import time
+
 import networkx as nx
+import numpy as np
+from networkx.algorithms.isomorphism import GraphMatcher
 from qiskit.transpiler.layout import Layout
 from qiskit.transpiler.basepasses import AnalysisPass
 from qiskit.transpiler.exceptions import TranspilerError
-from qiskit import QuantumRegister, ClassicalRegister
-from qiskit.dagcircuit import DAGCircuit
 
+from palloq.transpiler.crosstalk_model import CrosstalkModel
 
-class CrosstalkAdaptiveMultiLayout(AnalysisPass):
-    def __init__(self, backend_prop, crosstalk_prop=None, output_name=None):
+from .backend_cache import backend_table_cache, calibration_hash
+from .esp_scorer import ESPScorer, program_arrays
+from .layout_cache import batch_fingerprint
+from .layout_cache import layout_cache as _shared_layout_cache
+from .program_frontier import ProgramEdgeFrontier
+from .program_graph import program_graphs
+from .qubit_availability import QubitAvailability
+from .shortest_paths import floyd_warshall
 
-        super().__init__()
+
+# relative size of the random perturbation of CNOT reliabilities that
+# multi-start variants use to break near-ties differently
+_TIE_NOISE = 1e-3
+
+# log-scores closer than this are compared again with the exact products,
+# so the vectorized qubit selection breaks ties exactly like the scalar one
+_TIE_TOLERANCE = 1e-9
+
+
+def _log_reliab(reliabs):
+    """Elementwise log of reliabilities, -inf where the reliability is 0."""
+    with np.errstate(divide="ignore"):
+        return np.log(reliabs)
+
+
+class _SearchLimitReached(Exception):
+    """Raised by ``_BoundedGraphMatcher`` when its call limit is used up."""
+
+
+class _BoundedGraphMatcher(GraphMatcher):
+    """VF2 matcher that gives up after ``call_limit`` feasibility checks.
+
+    Every candidate pair of the search is checked once, so the limit bounds
+    the whole search, also when there is no embedding at all.
+    """
+
+    def __init__(self, G1, G2, call_limit=None):
+        super().__init__(G1, G2)
+        self.call_limit = call_limit
+        self.calls = 0
+
+    def syntactic_feasibility(self, G1_node, G2_node):
+        self.calls += 1
+        if self.call_limit is not None and self.calls > self.call_limit:
+            raise _SearchLimitReached
+        return super().syntactic_feasibility(G1_node, G2_node)
+
+
+def _subgraph_monomorphisms(graph, pattern, call_limit=None):
+    """Embeddings of ``pattern`` in ``graph`` found within ``call_limit`` VF2 steps.
+
+    Yields:
+        dict: node of ``graph`` -> node of ``pattern``
+    """
+    matcher = _BoundedGraphMatcher(graph, pattern, call_limit)
+    try:
+        yield from matcher.subgraph_monomorphisms_iter()
+    except _SearchLimitReached:
+        return
+
+
+def _run_layout_variant(context, prog_graphs, num_prog_qubits, placement_options,
+                        seed_rank, noise_seed, deadline=None):
+    """Run one greedy placement on a fresh state of ``context``.
+
+    ``placement_options`` are keyword arguments of ``_place_programs``.
+
+    Returns:
+        tuple: (prog2hw, ``_placement()`` of the variant), or None if the variant
+        could not place every program before ``deadline``
+    """
+    state = context.new_state()
+    state.prog_graphs = prog_graphs
+    state.num_prog_qubits = num_prog_qubits
+    try:
+        state._place_programs(seed_rank=seed_rank, noise_seed=noise_seed, deadline=deadline,
+                              **placement_options)
+    except TranspilerError:
+        return None
+    return state.prog2hw, state._placement()
+
+
+# context of the pass that started this worker process, see ``_init_worker``
+_worker_context = None
+
+
+def _init_worker(context):
+    """Pool initializer: keep ``context`` in the worker, so that tasks do not carry it."""
+    global _worker_context
+    _worker_context = context
+
+
+def _run_worker_variant(*args):
+    """``_run_layout_variant`` on the context of the worker process."""
+    return _run_layout_variant(_worker_context, *args)
+
+
+class CrosstalkAdaptiveContext:
+    """Backend tables of one calibration and crosstalk table.
+
+    The context is immutable: its arrays are read-only and every layout run
+    works on its own ``CrosstalkAdaptiveState``. One context can therefore be
+    shared by many passes and threads, and be sent to worker processes.
+    """
+
+    def __init__(self, backend_prop, crosstalk_model, tables, key=None):
+        """
+        Args:
+            backend_prop (BackendProperties): backend calibration
+            crosstalk_model (CrosstalkModel): crosstalk table
+            tables (dict): backend tables written by ``CrosstalkAdaptiveState._dump_tables``
+            key (str): calibration hash of the tables
+        """
         self.backend_prop = backend_prop
-        self.crosstalk_prop = self._parse_crosstalk_prop(crosstalk_prop)
+        self.crosstalk_model = crosstalk_model
+        self.key = key
+        self.tables = {}
+        for name, array in tables.items():
+            array = np.array(array, copy=True)
+            array.setflags(write=False)
+            self.tables[name] = array
+        self.num_hw_qubits = len(self.tables["readout_reliability"])
+
+    @classmethod
+    def from_backend(cls, backend_prop, crosstalk_prop=None, table_cache=None):
+        """Build the context of a calibration, reusing ``table_cache`` when possible.
+
+        Args:
+            backend_prop (BackendProperties): backend calibration
+            crosstalk_prop (dict or CrosstalkModel): crosstalk table
+            table_cache (BackendTableCache): cache of preprocessed backend tables.
+                Defaults to the cache shared by all layout passes.
+        """
+        crosstalk_model = CrosstalkModel.from_prop(crosstalk_prop)
+        table_cache = table_cache if table_cache is not None else backend_table_cache
+        key = calibration_hash(backend_prop, crosstalk_model)
+        tables = table_cache.get(key)
+        if tables is None:
+            state = CrosstalkAdaptiveState(len(backend_prop.qubits), crosstalk_model)
+            state._build_tables(backend_prop)
+            tables = state._dump_tables()
+            table_cache.put(key, tables)
+        return cls(backend_prop, crosstalk_model, tables, key)
+
+    def new_state(self):
+        """Fresh per-run state on top of the shared tables."""
+        state = CrosstalkAdaptiveState(self.num_hw_qubits, self.crosstalk_model)
+        state._load_tables(self.tables)
+        return state
+
+
+class CrosstalkAdaptiveState:
+    """Working state of one run of ``CrosstalkAdaptiveMultiLayout``.
+
+    Holds the copies of the backend tables that crosstalk updates during the
+    greedy placement, the qubits still available and the mapping built so far.
+    """
+
+    def __init__(self, num_hw_qubits, crosstalk_model):
+        """
+        Args:
+            num_hw_qubits (int): number of hardware qubits
+            crosstalk_model (CrosstalkModel): crosstalk table
+        """
+        self.crosstalk_model = crosstalk_model
         self.crosstalk_edges = []
         self.prog_graphs = []
-        self.output_name = output_name
         self.consumed_hw_edges = []
+        self.seed_rank = 0
 
-        self.swap_graph = nx.DiGraph()
+        self.num_hw_qubits = num_hw_qubits
+        self.swap_costs = None
+        self.swap_dists = None
         self.cx_reliability = {}
-        self.readout_reliability = {}
-        self.available_hw_qubits = []
+        self.cx_reliabs = None
+        self.coupling_mask = None
+        self.neighbor_index = None
+        self.neighbor_mask = None
+        self.readout_reliability = None
+        self.log_readout_reliability = None
+        self.available_hw_qubits = QubitAvailability(num_hw_qubits)
         self.gate_list = []
-        self.swap_paths = {}
-        self.swap_reliabs = {}
+        self.swap_paths = None
+        self.swap_reliabs = None
+        self.log_swap_reliabs = None
         self.gate_reliability = {}
-        self.qarg_to_id = {}
-        self.pending_program_edges = []
+        self.gate_position = {}
+        self.cx_heap = None
+        self.cx_noise = None
+        self.num_prog_qubits = 0
+        self.pending_program_edges = ProgramEdgeFrontier([])
         self.prog2hw = {}
 
-    def _initialize_backend_prop(self):
+    def _build_tables(self, backend_prop):
         """Extract readout and CNOT errors and compute swap costs."""
-        backend_prop = self.backend_prop
-        idx_list = []
+        num_qubits = self.num_hw_qubits
+        self.swap_costs = np.full((num_qubits, num_qubits), math.inf)
+        self.cx_reliabs = np.zeros((num_qubits, num_qubits))
+        self.coupling_mask = np.zeros((num_qubits, num_qubits), dtype=bool)
         for ginfo in backend_prop.gates:
             if ginfo.gate == "cx":
                 for item in ginfo.parameters:
@@ -45,151 +223,165 @@ class CrosstalkAdaptiveMultiLayout(AnalysisPass):
                 # convert swap reliability to edge weight
                 # for the Floyd-Warshall shortest weighted paths algorithm
                 swap_cost = -math.log(swap_reliab) if swap_reliab != 0 else math.inf
-                self.swap_graph.add_edge(
-                    ginfo.qubits[0], ginfo.qubits[1], weight=swap_cost
-                )
-                self.swap_graph.add_edge(
-                    ginfo.qubits[1], ginfo.qubits[0], weight=swap_cost
-                )
-                self.cx_reliability[(ginfo.qubits[0], ginfo.qubits[1])] = g_reliab
-                self.gate_list.append((ginfo.qubits[0], ginfo.qubits[1]))
-
+                q0, q1 = ginfo.qubits[0], ginfo.qubits[1]
+                self.swap_costs[q0, q1] = swap_cost
+                self.swap_costs[q1, q0] = swap_cost
+                self.coupling_mask[q0, q1] = True
+                self.coupling_mask[q1, q0] = True
+                self._set_cx_reliability((q0, q1), g_reliab)
+                self.gate_list.append((q0, q1))
+
+        # padded neighbor lists for the vectorized best-neighbor reduction
+        degrees = self.coupling_mask.sum(axis=1)
+        max_degree = int(degrees.max()) if num_qubits else 0
+        self.neighbor_index = np.zeros((num_qubits, max_degree), dtype=int)
+        self.neighbor_mask = np.arange(max_degree)[None, :] < degrees[:, None]
+        for q in range(num_qubits):
+            self.neighbor_index[q, : degrees[q]] = np.flatnonzero(self.coupling_mask[q])
+
+        self.readout_reliability = np.zeros(num_qubits)
+        measured_qubits = []
         idx = 0
         for q in backend_prop.qubits:
             for nduv in q:
                 if nduv.name == "readout_error":
                     self.readout_reliability[idx] = 1.0 - nduv.value
-                    self.available_hw_qubits.append(idx)
+                    measured_qubits.append(idx)
             idx += 1
+        self.available_hw_qubits = QubitAvailability(num_qubits, measured_qubits)
         self._update_edge_prop()
 
-    def _update_edge_prop(self):
-        for edge in self.cx_reliability:
+    def _dump_tables(self):
+        """Backend tables as a dict of arrays for ``BackendTableCache``."""
+        cx_edges = list(self.cx_reliability)
+        return {
+            "swap_costs": self.swap_costs,
+            "swap_dists": self.swap_dists,
+            "swap_paths": self.swap_paths,
+            "swap_reliabs": self.swap_reliabs,
+            "cx_edges": np.array(cx_edges, dtype=int).reshape(-1, 2),
+            "cx_values": np.array([self.cx_reliability[e] for e in cx_edges]),
+            "gate_values": np.array([self.gate_reliability[e] for e in cx_edges]),
+            "gate_list": np.array(self.gate_list, dtype=int).reshape(-1, 2),
+            "cx_reliabs": self.cx_reliabs,
+            "coupling_mask": self.coupling_mask,
+            "neighbor_index": self.neighbor_index,
+            "neighbor_mask": self.neighbor_mask,
+            "readout_reliability": self.readout_reliability,
+            "available_mask": self.available_hw_qubits.mask,
+        }
+
+    def _load_tables(self, tables):
+        """Restore the backend tables written by ``_dump_tables``.
+
+        The tables that crosstalk updates are copied, the others are shared.
+        """
+        cx_edges = [tuple(e) for e in tables["cx_edges"].tolist()]
+        self.cx_reliability = dict(zip(cx_edges, tables["cx_values"].tolist()))
+        self.gate_reliability = dict(zip(cx_edges, tables["gate_values"].tolist()))
+        self.gate_list = [tuple(e) for e in tables["gate_list"].tolist()]
+        self.swap_costs = tables["swap_costs"]
+        self.swap_dists = tables["swap_dists"]
+        self.swap_paths = tables["swap_paths"]
+        self.swap_reliabs = tables["swap_reliabs"].copy()
+        self.cx_reliabs = tables["cx_reliabs"].copy()
+        self.coupling_mask = tables["coupling_mask"]
+        self.neighbor_index = tables["neighbor_index"]
+        self.neighbor_mask = tables["neighbor_mask"]
+        self.readout_reliability = tables["readout_reliability"]
+        self.log_readout_reliability = _log_reliab(self.readout_reliability)
+        self.log_swap_reliabs = _log_reliab(self.swap_reliabs)
+        self.available_hw_qubits = QubitAvailability.from_mask(tables["available_mask"])
+
+    def _set_cx_reliability(self, edge, reliab):
+        """Update a CNOT reliability in both the edge dict and the matrix.
+
+        The matrix holds the reliability of the gate in the given direction
+        and falls back to the reverse direction when only that one exists.
+        """
+        self.cx_reliability[edge] = reliab
+        self.cx_reliabs[edge[0], edge[1]] = reliab
+        if (edge[1], edge[0]) not in self.cx_reliability:
+            self.cx_reliabs[edge[1], edge[0]] = reliab
+
+    def _update_edge_prop(self, changed_edges=None):
+        """Refresh gate and swap reliabilities.
+
+        Args:
+            changed_edges (list): hardware edges whose cx reliability changed.
+                If None, every table is rebuilt from scratch.
+        """
+        if changed_edges is None:
+            edges = list(self.cx_reliability)
+            self.swap_paths, self.swap_dists = floyd_warshall(self.swap_costs)
+            self.swap_reliabs = self._swap_reliab_columns(np.arange(self.num_hw_qubits))
+            self.log_swap_reliabs = _log_reliab(self.swap_reliabs)
+            self.log_readout_reliability = _log_reliab(self.readout_reliability)
+        else:
+            edges = changed_edges
+            # swap costs are unchanged, so only the columns next to the
+            # changed edges are stale
+            columns = np.array(sorted({q for edge in changed_edges for q in edge}))
+            self.swap_reliabs[:, columns] = self._swap_reliab_columns(columns)
+            self.log_swap_reliabs[:, columns] = _log_reliab(self.swap_reliabs[:, columns])
+
+        for edge in edges:
             self.gate_reliability[edge] = (
                 self.cx_reliability[edge]
                 * self.readout_reliability[edge[0]]
                 * self.readout_reliability[edge[1]]
             )
-        (
-            self.swap_paths,
-            swap_reliabs_temp,
-        ) = nx.algorithms.shortest_paths.dense.floyd_warshall_predecessor_and_distance(
-            self.swap_graph, weight="weight"
+        self._push_cx_heap(edges)
+
+    def _swap_reliab_columns(self, columns):
+        """Reliability of a CNOT from every hardware qubit to each of ``columns``.
+
+        Adjacent pairs use the CNOT reliability directly. Other pairs take the best
+        neighbor ``n`` of the target, swapping the source next to it along the
+        most reliable path: ``max_n exp(-dist[i, n]) * cx[n, j]``.
+        """
+        neighbors = self.neighbor_index[columns]
+        neighbor_reliabs = (
+            self.cx_reliabs[neighbors, columns[:, None]] * self.neighbor_mask[columns]
+        )
+        via_neighbor = np.exp(-self.swap_dists[:, neighbors]) * neighbor_reliabs
+        best_reliabs = via_neighbor.max(axis=2, initial=0.0)
+        return np.where(
+            self.coupling_mask[:, columns],
+            self.cx_reliabs[:, columns],
+            best_reliabs,
         )
-        for i in swap_reliabs_temp:
-            self.swap_reliabs[i] = {}
-            for j in swap_reliabs_temp[i]:
-                if (i, j) in self.cx_reliability:
-                    self.swap_reliabs[i][j] = self.cx_reliability[(i, j)]
-                elif (j, i) in self.cx_reliability:
-                    self.swap_reliabs[i][j] = self.cx_reliability[(j, i)]
-                else:
-                    best_reliab = 0.0
-                    for n in self.swap_graph.neighbors(j):
-                        if (n, j) in self.cx_reliability:
-                            reliab = (
-                                math.exp(-swap_reliabs_temp[i][n])
-                                * self.cx_reliability[(n, j)]
-                            )
-                        else:
-                            reliab = (
-                                math.exp(-swap_reliabs_temp[i][n])
-                                * self.cx_reliability[(j, n)]
-                            )
-                        if reliab > best_reliab:
-                            best_reliab = reliab
-                    self.swap_reliabs[i][j] = best_reliab
 
     def _crosstalk_backend_prop(self, edge):
         q0 = min(edge[0], edge[1])
         q1 = max(edge[0], edge[1])
         edge = (q0, q1)
-        if self.crosstalk_prop and edge in self.crosstalk_prop:
-            for xtalk_edge, crosstalk_ratio in self.crosstalk_prop[edge].items():
+        if self.crosstalk_model.is_source(edge):
+            changed_edges = []
+            # the model already holds the larger ratio of both directions
+            xtalk_edges, crosstalk_ratios = self.crosstalk_model.affected_edges(edge)
+            for xtalk_edge, crosstalk_ratio in zip(xtalk_edges, crosstalk_ratios.tolist()):
                 cx_err = 1 - self.cx_reliability[xtalk_edge]
-                """論文に要説明
-                Rule:   
-                    双方向にクロストークの影響がある場合、より大きな方を考慮に入れて
-                    エラー情報のアップデートを行う
-                """
-                try:
-                    crosstalk_ratio = max(
-                        self.crosstalk_prop[xtalk_edge][edge],
-                        crosstalk_ratio,
-                    )
-                except:
-                    pass
-                _tmp_cx_err = cx_err
                 if crosstalk_ratio >= 1:
                     cx_err *= crosstalk_ratio
                 cx_err = cx_err if cx_err <= 0.9999 else 0.9999
-                self.cx_reliability[xtalk_edge] = 1 - cx_err
+                self._set_cx_reliability(xtalk_edge, 1 - cx_err)
+                changed_edges.append(xtalk_edge)
 
             self.crosstalk_edges.append(edge)
-            self._update_edge_prop()
-
-    def _parse_crosstalk_prop(self, crosstalk_prop):
-        if crosstalk_prop is not None:
-            sorted_prop = {}
-            for _edge in crosstalk_prop:
-                q0 = min(_edge[0], _edge[1])
-                q1 = max(_edge[0], _edge[1])
-                edge = (q0, q1)
-                sorted_prop[edge] = {}
-                for _xtalk_edge in crosstalk_prop[_edge]:
-                    q0 = min(_xtalk_edge[0], _xtalk_edge[1])
-                    q1 = max(_xtalk_edge[0], _xtalk_edge[1])
-                    xtalk_edge = (q0, q1)
-                    xtalk_ratio = crosstalk_prop[_edge][_xtalk_edge]
-                    sorted_prop[edge][xtalk_edge] = xtalk_ratio
-            return sorted_prop
-        return None
+            self._update_edge_prop(changed_edges)
 
     def _create_program_graphs(self, dag):
         """Program graph has virtual qubits as nodes.
 
         Two nodes have an edge if the corresponding virtual qubits
         participate in a 2-qubit gate. The edge is weighted by the
-        number of CNOTs between the pair.
-        """
-        idx = 0
-        for q in dag.qubits:
-            self.qarg_to_id[q.register.name + str(q.index)] = idx
-            idx += 1
-        prog_graph = nx.Graph()
-        for gate in dag.two_qubit_ops():
-            qid1 = self._qarg_to_id(gate.qargs[0])
-            qid2 = self._qarg_to_id(gate.qargs[1])
-            min_q = min(qid1, qid2)
-            max_q = max(qid1, qid2)
-            edge_weight = 1
-            if prog_graph.has_edge(min_q, max_q):
-                edge_weight = prog_graph[min_q][max_q]["weight"] + 1
-            prog_graph.add_edge(min_q, max_q, weight=edge_weight)
-
-        prog_subgraphs = list(
-            prog_graph.subgraph(c) for c in nx.connected_components(prog_graph)
-        )
-        self.prog_graphs = self._sort_graphs(prog_subgraphs)
-        return idx
-
-    def _sort_graphs(self, graph_list):
-        """
-        w: total weight of edges in graph
-
+        number of CNOTs between the pair. Virtual qubits are numbered
+        by their position in ``dag.qubits``.
         """
-        graph_volumes = {}
-        order = []
-        for i, graph in enumerate(graph_list):
-            graph_volumes[i] = graph.size(weight="weight") * graph.number_of_nodes()
-        return [
-            graph_list[id_kq[0]]
-            for id_kq in sorted(graph_volumes.items(), key=lambda x: x[1], reverse=True)
-        ]
-
-    def _qarg_to_id(self, qubit):
-        """Convert qarg with name and value to an integer id."""
-        return self.qarg_to_id[qubit.register.name + str(qubit.index)]
+        self.num_prog_qubits = len(dag.qubits)
+        self.prog_graphs = program_graphs(dag)
+        return self.num_prog_qubits
 
     def _select_next_edge(self):
         """Select the next edge.
@@ -197,151 +389,502 @@ class CrosstalkAdaptiveMultiLayout(AnalysisPass):
         If there is an edge with one endpoint mapped, return it.
         Else return in the first edge
         """
-        for edge in self.pending_program_edges:
-            q1_mapped = edge[0] in self.prog2hw
-            q2_mapped = edge[1] in self.prog2hw
-            assert not (q1_mapped and q2_mapped)
-            if q1_mapped or q2_mapped:
-                return edge
-        return self.pending_program_edges[0]
+        return self.pending_program_edges.next_edge()
 
-    def _select_best_remaining_cx(self):
-        """Select best remaining CNOT in the hardware for the next program edge."""
-        candidates = []
-        for gate in self.gate_list:
-            chk1 = gate[0] in self.available_hw_qubits
-            chk2 = gate[1] in self.available_hw_qubits
-            if chk1 and chk2:
-                candidates.append(gate)
-        best_reliab = 0
-        best_item = None
-        for item in candidates:
-            if self.gate_reliability[item] > best_reliab:
-                best_reliab = self.gate_reliability[item]
-                best_item = item
-        return best_item
+    def _build_cx_heap(self, noise_seed=None):
+        """Index the hardware CNOTs in a max-heap keyed on gate reliability.
 
-    def _select_best_remaining_qubit(self, prog_qubit, prog_graph):
-        """Select the best remaining hardware qubit for the next program qubit."""
-        reliab_store = {}
-        for hw_qubit in self.available_hw_qubits:
-            reliab = 1
-            for n in prog_graph.neighbors(prog_qubit):
-                if n in self.prog2hw:
-                    reliab *= self.swap_reliabs[self.prog2hw[n]][hw_qubit]
-            reliab *= self.readout_reliability[hw_qubit]
-            reliab_store[hw_qubit] = reliab
-        max_reliab = 0
-        best_hw_qubit = None
-        for hw_qubit in reliab_store:
-            if reliab_store[hw_qubit] > max_reliab:
-                max_reliab = reliab_store[hw_qubit]
-                best_hw_qubit = hw_qubit
-        return best_hw_qubit
-
-    def _correct_xtalk_prop_keys(self):
-        corrected_prop = {}
-        for twoQcon, xtalk_dict in self.crosstalk_prop.items(): 
-            corrected_dict = {}
-            corrected_twoQcon = (min(twoQcon[0], twoQcon[1]), max(twoQcon[0], twoQcon[1]))
-            for pair, xtalk_ratio in xtalk_dict.items(): 
-                corrected_pair = (min(pair[0], pair[1]), max(pair[0], pair[1]))
-                corrected_dict[corrected_pair] = xtalk_ratio
-            corrected_prop[corrected_twoQcon] = corrected_dict
-        self.crosstalk_prop = corrected_prop
+        Ties are broken by position in ``gate_list``. Entries are deleted lazily:
+        an entry is dropped when one of its qubits is no longer available or its
+        reliability is out of date (a fresh entry is pushed on every update).
 
+        Args:
+            noise_seed: if given, the heap keys are perturbed by a small random
+                factor so that near-ties are broken differently
+        """
+        self.gate_position = {}
+        for pos, gate in enumerate(self.gate_list):
+            self.gate_position.setdefault(gate, pos)
+        if noise_seed is None:
+            self.cx_noise = np.ones(len(self.gate_list))
+        else:
+            rng = np.random.default_rng(noise_seed)
+            self.cx_noise = 1 + _TIE_NOISE * rng.uniform(-1, 1, len(self.gate_list))
+        self.cx_heap = [self._cx_heap_entry(gate, pos) for pos, gate in enumerate(self.gate_list)]
+        heapq.heapify(self.cx_heap)
+
+    def _cx_heap_entry(self, gate, pos):
+        reliab = self.gate_reliability[gate]
+        return (-reliab * self.cx_noise[pos], pos, gate, reliab)
+
+    def _push_cx_heap(self, edges):
+        """Re-index CNOTs whose gate reliability changed."""
+        if self.cx_heap is None:
+            return
+        for edge in edges:
+            if edge in self.gate_position:
+                heapq.heappush(self.cx_heap, self._cx_heap_entry(edge, self.gate_position[edge]))
 
-    def run(self, dag):
-        """Run the CrosstalkAdaptiveLayout pass on `list of dag`."""
-        self._correct_xtalk_prop_keys()
-        self._initialize_backend_prop()
-        num_qubits = self._create_program_graphs(dag=dag)
+    def _select_best_remaining_cx(self):
+        """Select best remaining CNOT in the hardware for the next program edge.
 
-        if num_qubits > len(self.available_hw_qubits):
-            raise TranspilerError("Number of qubits greater than device.")
+        If ``seed_rank`` is set, the CNOT of that rank is taken instead of the
+        best one, once.
+        """
+        heap = self.cx_heap
+        skipped = []
+        best_item = None
+        while heap:
+            _, _, gate, reliab = heap[0]
+            stale = (
+                gate[0] not in self.available_hw_qubits
+                or gate[1] not in self.available_hw_qubits
+                or reliab != self.gate_reliability[gate]
+            )
+            if stale:
+                heapq.heappop(heap)
+            elif reliab <= 0:
+                break
+            elif len(skipped) < self.seed_rank:
+                skipped.append(heapq.heappop(heap))
+            else:
+                best_item = gate
+                break
+        if skipped:
+            if best_item is None:
+                best_item = skipped[-1][2]
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+        self.seed_rank = 0
+        return best_item
 
-        for hwid, q in enumerate(dag.qubits):
-            self.qarg_to_id[q.register.name + str(q.index)] = hwid
+    def _select_best_remaining_qubit(self, prog_qubit, prog_graph):
+        """Select the best remaining hardware qubit for the next program qubit.
 
+        A hardware qubit scores the product of its readout reliability and the
+        swap reliabilities to the hardware qubits of the already mapped neighbours.
+        All qubits are scored at once as a sum of log-reliability rows.
+        """
+        mapped = [self.prog2hw[n] for n in prog_graph.neighbors(prog_qubit) if n in self.prog2hw]
+        scores = self.log_readout_reliability + self.log_swap_reliabs[mapped].sum(axis=0)
+        scores[~self.available_hw_qubits.mask] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] == -np.inf:
+            return None
+
+        ties = np.flatnonzero(scores >= scores[best] - _TIE_TOLERANCE)
+        if len(ties) > 1:
+            # the first (lowest-numbered) qubit with the largest exact product wins
+            reliabs = np.ones(len(ties))
+            for hw_qubit in mapped:
+                reliabs *= self.swap_reliabs[hw_qubit, ties]
+            reliabs *= self.readout_reliability[ties]
+            if reliabs.max() <= 0:
+                return None
+            best = int(ties[np.argmax(reliabs)])
+        return best
+
+    def _embed_program(self, prog_graph, call_limit=None):
+        """Place a program without SWAPs if it fits the free coupling graph.
+
+        Embeddings of the program graph into the coupling graph of the available
+        qubits are enumerated with VF2 (subgraph monomorphisms). The one with the
+        best log reliability of its CNOTs and readouts is taken.
+
+        Args:
+            prog_graph (ProgramGraph): program to place
+            call_limit (int): VF2 steps (candidate pairs checked) before the search
+                stops with the embeddings found so far, None for an exhaustive search
+
+        Returns:
+            bool: True if the program was placed
+        """
+        free = self.available_hw_qubits.mask
+        hw_edges = np.argwhere(np.triu(self.coupling_mask & free[:, None] & free[None, :]))
+        hw_graph = nx.Graph()
+        hw_graph.add_edges_from(hw_edges.tolist())
+        program = nx.Graph()
+        program.add_edges_from(prog_graph.edges.tolist())
+
+        nodes = prog_graph.nodes.tolist()
+        embeddings = []
+        for mapping in _subgraph_monomorphisms(hw_graph, program, call_limit):
+            hw_of = {q: hw for hw, q in mapping.items()}
+            embeddings.append([hw_of[q] for q in nodes])
+        if not embeddings:
+            return False
+
+        # score every embedding at once with the current (crosstalk-updated) tables
+        embeddings = np.array(embeddings, dtype=int)
+        positions = np.searchsorted(prog_graph.nodes, prog_graph.edges)
+        hw0 = embeddings[:, positions[:, 0]]
+        hw1 = embeddings[:, positions[:, 1]]
+        scores = (_log_reliab(self.cx_reliabs[hw0, hw1]) * prog_graph.weights).sum(axis=1)
+        scores += self.log_readout_reliability[embeddings].sum(axis=1)
+        best = int(np.argmax(scores))
+        if scores[best] == -np.inf:
+            return False
+
+        for q, hw_qubit in zip(nodes, embeddings[best].tolist()):
+            self.prog2hw[q] = hw_qubit
+            self.available_hw_qubits.remove(hw_qubit)
+        for q0, q1, _ in prog_graph.placement_order():
+            self._crosstalk_backend_prop(edge=(self.prog2hw[q0], self.prog2hw[q1]))
+        return True
+
+    def _place_programs(self, seed_rank=0, noise_seed=None, vf2_max_qubits=0,
+                        vf2_call_limit=None, deadline=None):
+        """Greedily map every program graph onto the hardware qubits.
+
+        Args:
+            seed_rank (int): rank of the hardware CNOT used for the first placement
+            noise_seed: seed for perturbing near-ties between hardware CNOTs
+            vf2_max_qubits (int): programs up to this size are first embedded
+                without SWAPs with ``_embed_program``
+            vf2_call_limit (int): VF2 steps per program
+            deadline (float): ``time.monotonic()`` after which no further program is placed
+
+        Raises:
+            TranspilerError: if a program cannot be placed or the deadline has passed.
+        """
+        self._build_cx_heap(noise_seed)
+        self.seed_rank = seed_rank
         for prog_graph in self.prog_graphs:
-            # sort by weight, then edge name for determinism (since networkx on python 3.5 returns
-            # different order of edges)
-            """NEXT STEP!
-            ここに、Multi-programmingするかどうかの判定関数を噛ませる
-            """
-            self.pending_program_edges = sorted(
-                prog_graph.edges(data=True),
-                key=lambda x: [x[2]["weight"], -x[0], -x[1]],
-                reverse=True,
-            )
+            if deadline is not None and time.monotonic() > deadline:
+                raise TranspilerError("Layout time budget exceeded.")
+            self._place_program(prog_graph, vf2_max_qubits, vf2_call_limit)
+        self._place_idle_qubits()
+
+    def _place_program(self, prog_graph, vf2_max_qubits=0, vf2_call_limit=None):
+        """Map one program graph onto the available hardware qubits."""
+        if len(prog_graph) <= vf2_max_qubits and self._embed_program(
+            prog_graph, vf2_call_limit
+        ):
+            return
+        """NEXT STEP!
+        ここに、Multi-programmingするかどうかの判定関数を噛ませる
+        """
+        self.pending_program_edges = ProgramEdgeFrontier(
+            prog_graph.placement_order(),
+            mapped=[q for q in prog_graph.nodes.tolist() if q in self.prog2hw],
+        )
 
-            while self.pending_program_edges:
-
-                edge = self._select_next_edge()
-                q1_mapped = edge[0] in self.prog2hw
-                q2_mapped = edge[1] in self.prog2hw
-                if (not q1_mapped) and (not q2_mapped):
-                    best_hw_edge = self._select_best_remaining_cx()
-                    if best_hw_edge is None:
-                        raise TranspilerError(
-                            "CNOT({}, {}) could not be placed "
-                            "in selected device.".format(edge[0], edge[1])
-                        )
-                    self.prog2hw[edge[0]] = best_hw_edge[0]
-                    self.prog2hw[edge[1]] = best_hw_edge[1]
-                    self.available_hw_qubits.remove(best_hw_edge[0])
-                    self.available_hw_qubits.remove(best_hw_edge[1])
-
-                    self._crosstalk_backend_prop(edge=best_hw_edge)
-                elif not q1_mapped:
-                    best_hw_qubit = self._select_best_remaining_qubit(
-                        edge[0], prog_graph
+        while self.pending_program_edges:
+
+            edge = self._select_next_edge()
+            q1_mapped = edge[0] in self.prog2hw
+            q2_mapped = edge[1] in self.prog2hw
+            if (not q1_mapped) and (not q2_mapped):
+                best_hw_edge = self._select_best_remaining_cx()
+                if best_hw_edge is None:
+                    raise TranspilerError(
+                        "CNOT({}, {}) could not be placed "
+                        "in selected device.".format(edge[0], edge[1])
                     )
-                    if best_hw_qubit is None:
-                        raise TranspilerError(
-                            "CNOT({}, {}) could not be placed in selected device. "
-                            "No qubit near qr[{}] available".format(
-                                edge[0], edge[1], edge[0]
-                            )
+                self.prog2hw[edge[0]] = best_hw_edge[0]
+                self.prog2hw[edge[1]] = best_hw_edge[1]
+                self.available_hw_qubits.remove(best_hw_edge[0])
+                self.available_hw_qubits.remove(best_hw_edge[1])
+
+                self._crosstalk_backend_prop(edge=best_hw_edge)
+            elif not q1_mapped:
+                best_hw_qubit = self._select_best_remaining_qubit(
+                    edge[0], prog_graph
+                )
+                if best_hw_qubit is None:
+                    raise TranspilerError(
+                        "CNOT({}, {}) could not be placed in selected device. "
+                        "No qubit near qr[{}] available".format(
+                            edge[0], edge[1], edge[0]
                         )
-                    self.prog2hw[edge[0]] = best_hw_qubit
-                    self.available_hw_qubits.remove(best_hw_qubit)
-                    self._crosstalk_backend_prop(
-                        edge=(self.prog2hw[edge[1]], best_hw_qubit)
-                    )
-                else:
-                    best_hw_qubit = self._select_best_remaining_qubit(
-                        edge[1], prog_graph
                     )
-                    if best_hw_qubit is None:
-                        raise TranspilerError(
-                            "CNOT({}, {}) could not be placed in selected device. "
-                            "No qubit near qr[{}] available".format(
-                                edge[0], edge[1], edge[1]
-                            )
+                self.prog2hw[edge[0]] = best_hw_qubit
+                self.available_hw_qubits.remove(best_hw_qubit)
+                self._crosstalk_backend_prop(
+                    edge=(self.prog2hw[edge[1]], best_hw_qubit)
+                )
+            else:
+                best_hw_qubit = self._select_best_remaining_qubit(
+                    edge[1], prog_graph
+                )
+                if best_hw_qubit is None:
+                    raise TranspilerError(
+                        "CNOT({}, {}) could not be placed in selected device. "
+                        "No qubit near qr[{}] available".format(
+                            edge[0], edge[1], edge[1]
                         )
-                    self.prog2hw[edge[1]] = best_hw_qubit
-                    self.available_hw_qubits.remove(best_hw_qubit)
-                    self._crosstalk_backend_prop(
-                        edge=(self.prog2hw[edge[0]], best_hw_qubit)
                     )
-                new_edges = [
-                    x
-                    for x in self.pending_program_edges
-                    if not (x[0] in self.prog2hw and x[1] in self.prog2hw)
-                ]
-
-                self.pending_program_edges = new_edges
+                self.prog2hw[edge[1]] = best_hw_qubit
+                self.available_hw_qubits.remove(best_hw_qubit)
+                self._crosstalk_backend_prop(
+                    edge=(self.prog2hw[edge[0]], best_hw_qubit)
+                )
+            self.pending_program_edges.mark_mapped(edge[0])
+            self.pending_program_edges.mark_mapped(edge[1])
 
-        for qid in self.qarg_to_id.values():
+    def _place_idle_qubits(self):
+        """Map the program qubits without two-qubit gates onto the first free qubits."""
+        for qid in range(self.num_prog_qubits):
             if qid not in self.prog2hw:
-                self.prog2hw[qid] = self.available_hw_qubits[0]
+                self.prog2hw[qid] = self.available_hw_qubits.first()
                 self.available_hw_qubits.remove(self.prog2hw[qid])
 
+    def _placement(self):
+        """``prog2hw`` relative to the program graphs, for ``LayoutCache``.
+
+        Returns:
+            tuple: (hardware qubits of the nodes of each program, hardware qubits
+            of the idle program qubits, hardware CNOTs whose crosstalk was applied)
+        """
+        programs = tuple(
+            tuple(self.prog2hw[q] for q in prog_graph.nodes.tolist())
+            for prog_graph in self.prog_graphs
+        )
+        idle = tuple(self.prog2hw[q] for q in self._idle_qubits())
+        return programs, idle, tuple(self.crosstalk_edges)
+
+    def _restore_placement(self, placement):
+        """Set ``prog2hw`` from an entry of ``LayoutCache`` and replay its crosstalk."""
+        programs, idle, crosstalk_edges = placement
+        self.prog2hw = {}
+        for prog_graph, hw_qubits in zip(self.prog_graphs, programs):
+            self.prog2hw.update(zip(prog_graph.nodes.tolist(), hw_qubits))
+        self.prog2hw.update(zip(self._idle_qubits(), idle))
+        for hw_qubit in self.prog2hw.values():
+            self.available_hw_qubits.remove(hw_qubit)
+        for edge in crosstalk_edges:
+            self._crosstalk_backend_prop(edge)
+
+    def _idle_qubits(self):
+        """Program qubits without two-qubit gates, in ascending order."""
+        idle = np.ones(self.num_prog_qubits, dtype=bool)
+        for prog_graph in self.prog_graphs:
+            idle[prog_graph.nodes] = False
+        return np.flatnonzero(idle).tolist()
+
+    def to_layout(self, dag):
+        """Layout of the virtual qubits of ``dag`` after placement."""
         layout_dict = {}
-        for q in dag.qubits:
-            pid = self._qarg_to_id(q)
-            hwid = self.prog2hw[pid]
-            # layout[q] = hwid
-            layout_dict[q] = hwid
-        self.property_set["layout"] = Layout(input_dict=layout_dict)
+        for pid, q in enumerate(dag.qubits):
+            layout_dict[q] = self.prog2hw[pid]
+        return Layout(input_dict=layout_dict)
+
+
+class CrosstalkAdaptiveMultiLayout(AnalysisPass):
+    def __init__(self, backend_prop, crosstalk_prop=None, output_name=None, table_cache=None,
+                 num_starts=1, time_budget=None, seed=None, max_workers=None, context=None,
+                 layout_cache=None, vf2_max_qubits=0, vf2_call_limit=10000):
+        """CrosstalkAdaptiveMultiLayout initializer.
+
+        The backend tables are prepared once, here, in an immutable
+        ``CrosstalkAdaptiveContext``. Every run keeps its working state in a
+        ``CrosstalkAdaptiveState``, so one instance can lay out many DAGs, also
+        concurrently from several threads with :meth:`place`.
+
+        Args:
+            backend_prop (BackendProperties): backend calibration
+            crosstalk_prop (dict or CrosstalkModel): crosstalk table {(i, j): {(k, l): ratio}}
+            output_name (str): name of the output circuit
+            table_cache (BackendTableCache): cache of preprocessed backend tables.
+                Defaults to the cache shared by all layout passes.
+            num_starts (int): number of greedy variants to try. The first one is the
+                plain greedy layout, the others start from a different hardware CNOT
+                and perturb near-ties. The variant with the best score is kept.
+            time_budget (float): wall-clock seconds for the multi-start search.
+                Variants that are not finished in time are dropped, and worker
+                processes still running them are terminated.
+            seed (int): seed for the perturbations of the variants
+            max_workers (int): worker processes for the variants. 1 runs them in
+                this process. The pool is started on first use and kept for later
+                runs, until :meth:`close` or a run that exceeds ``time_budget``.
+            context (CrosstalkAdaptiveContext): backend tables to share with other
+                passes. ``backend_prop``, ``crosstalk_prop`` and ``table_cache`` are
+                not used to build a new one if given.
+            layout_cache (LayoutCache): placements of batches seen before, keyed by
+                their structure and the calibration. Defaults to the cache shared by
+                all layout passes. Not used with a context without a calibration
+                key, or with several starts and no ``seed``.
+            vf2_max_qubits (int): programs with at most this many qubits are placed
+                on an embedding of their graph in the free coupling graph, so they
+                need no SWAPs. The greedy placement is used when there is none.
+                0 disables the embedding search.
+            vf2_call_limit (int): VF2 steps (candidate pairs checked) per program. It
+                bounds the search also when the program has no embedding.
+        """
+
+        super().__init__()
+        if context is None:
+            context = CrosstalkAdaptiveContext.from_backend(
+                backend_prop, crosstalk_prop, table_cache
+            )
+        self.context = context
+        self.backend_prop = context.backend_prop
+        self.crosstalk_model = context.crosstalk_model
+        self.output_name = output_name
+        self.num_starts = num_starts
+        self.time_budget = time_budget
+        self.seed = seed
+        self.max_workers = max_workers
+        self.placement_options = {
+            "vf2_max_qubits": vf2_max_qubits,
+            "vf2_call_limit": vf2_call_limit,
+        }
+        self.layout_cache = layout_cache if layout_cache is not None else _shared_layout_cache
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def __getstate__(self):
+        # the worker pool and its lock stay with this process
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        del state["_pool_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool_lock = threading.Lock()
+
+    def __del__(self):
+        self._terminate_pool()
+
+    def close(self):
+        """Terminate the worker processes of the multi-start variants."""
+        with self._pool_lock:
+            self._terminate_pool()
+
+    def _terminate_pool(self):
+        pool, self._pool = getattr(self, "_pool", None), None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    def _pool_variants(self, args, variants, deadline):
+        """Run ``variants`` in the worker pool until ``deadline``.
+
+        The workers get the context once, from the pool initializer. Runs that
+        share the pass take turns on the pool, because a run that exceeds the
+        budget terminates the workers, with whatever they are running.
+
+        Returns:
+            list: results of the variants finished in time, in variant order
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(
+                    self.max_workers, initializer=_init_worker, initargs=(self.context,)
+                )
+            # time.monotonic() is system-wide, so workers check the same deadline
+            pending = [
+                self._pool.apply_async(_run_worker_variant,
+                                       args + (seed_rank, noise_seed, deadline))
+                for seed_rank, noise_seed in variants
+            ]
+            for result in pending:
+                result.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            finished = [result.get() for result in pending if result.ready()]
+            if len(finished) < len(pending):
+                # nothing may keep running past the budget
+                self._terminate_pool()
+        return finished
+
+    def _multi_start_layout(self, state):
+        """Run ``num_starts`` greedy variants and keep the mapping with the best ESP.
+
+        The plain greedy variant runs first in this process, so there is always a
+        result. The other variants run in a process pool, see ``_pool_variants``,
+        until ``time_budget`` runs out. The best placement is replayed on ``state``, so its
+        availability and crosstalk-updated tables match the reported layout.
+        """
+        deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+        args = (state.prog_graphs, state.num_prog_qubits, self.placement_options)
+        seed = self.seed if self.seed is not None else np.random.SeedSequence().entropy
+        variants = [
+            (i % max(len(state.gate_list), 1), [seed, i]) for i in range(1, self.num_starts)
+        ]
+
+        greedy = _run_layout_variant(self.context, *args, 0, None)
+        if greedy is None:
+            # report the placement error of the plain greedy pass
+            state._place_programs(**self.placement_options)
+            return
+        results = [greedy]
+
+        if self.max_workers == 1:
+            for seed_rank, noise_seed in variants:
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+                results.append(
+                    _run_layout_variant(self.context, *args, seed_rank, noise_seed, deadline)
+                )
+        elif variants:
+            results += self._pool_variants(args, variants, deadline)
+
+        scorer = ESPScorer.from_tables(self.context.tables, self.crosstalk_model)
+        programs = program_arrays(state.prog_graphs)
+        scored = [
+            (scorer.log_esp(prog2hw, programs)[1], placement)
+            for prog2hw, placement in filter(None, results)
+        ]
+        # max() keeps the first of equal scores, so ties go to the plain greedy layout
+        state._restore_placement(max(scored, key=lambda item: item[0])[1])
+
+    def place(self, dag):
+        """Map the programs of ``dag`` onto the hardware.
+
+        Keeps its working state out of the pass instance, so it can be called
+        from several threads at once. Only the worker pool of the multi-start
+        variants is shared, and used by one run at a time.
+
+        Returns:
+            CrosstalkAdaptiveState: state after placement, with ``prog2hw``
+            and ``prog_graphs``
+        """
+        state = self.context.new_state()
+        num_qubits = state._create_program_graphs(dag=dag)
+
+        if num_qubits > len(state.available_hw_qubits):
+            raise TranspilerError("Number of qubits greater than device.")
+
+        if not self._cacheable():
+            self._place(state)
+            return state
+
+        key = (self.context.key, batch_fingerprint(state.prog_graphs, num_qubits))
+        key += self._cache_options()
+        placement = self.layout_cache.get(key)
+        if placement is not None:
+            state._restore_placement(placement)
+            return state
+
+        self._place(state)
+        self.layout_cache.put(key, state._placement())
+        return state
+
+    def _cacheable(self):
+        """Whether placements can go to ``layout_cache``.
+
+        A context built without a calibration key cannot be told apart from
+        another calibration, and unseeded multi-start runs differ every time.
+        """
+        return self.context.key is not None and (self.num_starts <= 1 or self.seed is not None)
+
+    def _cache_options(self):
+        """Options that change the placement, for the ``layout_cache`` key."""
+        # the seed only matters for the multi-start variants
+        return (
+            type(self).__name__,
+            self.num_starts,
+            self.seed if self.num_starts > 1 else None,
+            tuple(sorted(self.placement_options.items())),
+        )
+
+    def _place(self, state):
+        """Place the program graphs of ``state``."""
+        if self.num_starts > 1:
+            self._multi_start_layout(state)
+        else:
+            state._place_programs(**self.placement_options)
+
+    def run(self, dag):
+        """Run the CrosstalkAdaptiveLayout pass on `list of dag`."""
+        self.property_set["layout"] = self.place(dag).to_layout(dag)
@@ -0,0 +1,164 @@
+"""Estimated success probability (ESP) of multi-program layouts."""
+from collections import namedtuple
+
+import numpy as np
+
+from palloq.transpiler.crosstalk_model import CrosstalkModel
+
+ProgramArrays = namedtuple(
+    "ProgramArrays", ["edges", "weights", "edge_program", "qubits", "qubit_program", "num_programs"]
+)
+ProgramArrays.__doc__ = """Program graphs flattened into arrays.
+
+    edges: (E, 2) program qubit ids of every program edge
+    weights: (E,) number of CNOTs on each edge
+    edge_program: (E,) index of the program graph each edge belongs to
+    qubits: (Q,) program qubit ids of every node
+    qubit_program: (Q,) index of the program graph each node belongs to
+    num_programs: number of program graphs
+"""
+
+
+def program_arrays(prog_graphs):
+    """Flatten the program graphs of ``CrosstalkAdaptiveMultiLayout`` into arrays."""
+    pids = np.arange(len(prog_graphs))
+    return ProgramArrays(
+        np.concatenate([np.zeros((0, 2), dtype=int)] + [g.edges for g in prog_graphs]),
+        np.concatenate([np.zeros(0)] + [g.weights for g in prog_graphs]).astype(float),
+        np.repeat(pids, [len(g.edges) for g in prog_graphs]),
+        np.concatenate([np.zeros(0, dtype=int)] + [g.nodes for g in prog_graphs]),
+        np.repeat(pids, [len(g.nodes) for g in prog_graphs]),
+        len(prog_graphs),
+    )
+
+
+class ESPScorer:
+    """Vectorized ESP of a mapping of program graphs onto hardware qubits.
+
+    A program succeeds if every CNOT and every readout succeeds. A program edge
+    mapped onto a hardware CNOT uses that CNOT's reliability, with its error
+    multiplied by the crosstalk ratio of every other used hardware CNOT that
+    affects it (capped at 0.9999, as in the layout pass). Other program edges
+    use the swap reliability between their hardware qubits. Each qubit adds its
+    readout reliability.
+
+    The scorer only reads calibration tables, so one instance can score many
+    candidate layouts in a loop.
+    """
+
+    def __init__(self, swap_reliabs, cx_reliabs, coupling_mask, readout_reliability,
+                 crosstalk_model=None):
+        """
+        Args:
+            swap_reliabs (ndarray): n x n CNOT reliability after swaps
+            cx_reliabs (ndarray): n x n CNOT reliability of adjacent qubits
+            coupling_mask (ndarray): n x n True where a CNOT exists
+            readout_reliability (ndarray): readout reliability of each qubit
+            crosstalk_model (CrosstalkModel or dict): crosstalk table
+        """
+        with np.errstate(divide="ignore"):
+            self.log_swap_reliabs = np.log(swap_reliabs)
+            self.log_readout_reliability = np.log(readout_reliability)
+        self.cx_reliabs = cx_reliabs
+        self.coupling_mask = coupling_mask
+        self.crosstalk_model = CrosstalkModel.from_prop(crosstalk_model)
+
+        # crosstalk pairs as (source, target, ratio) with hardware edge ids
+        model = self.crosstalk_model
+        num_qubits = len(readout_reliability)
+        self._xtalk_edge_ids = np.full((num_qubits, num_qubits), -1)
+        if len(model.edges):
+            in_range = (model.edges < num_qubits).all(axis=1)
+            ids = np.flatnonzero(in_range)
+            self._xtalk_edge_ids[model.edges[ids, 0], model.edges[ids, 1]] = ids
+            self._xtalk_edge_ids[model.edges[ids, 1], model.edges[ids, 0]] = ids
+        counts = np.diff(model.affects_ptr)
+        self._xtalk_source = np.repeat(np.arange(len(model.edges)), counts)
+        self._xtalk_target = model.affects_idx
+        self._xtalk_ratio = np.maximum(model.affects_ratio, 1.0)
+
+    @classmethod
+    def from_tables(cls, tables, crosstalk_model=None):
+        """Scorer from the tables of a ``CrosstalkAdaptiveContext``."""
+        return cls(
+            tables["swap_reliabs"],
+            tables["cx_reliabs"],
+            tables["coupling_mask"],
+            tables["readout_reliability"],
+            crosstalk_model,
+        )
+
+    @classmethod
+    def from_backend(cls, backend_prop, crosstalk_prop=None, table_cache=None):
+        """Scorer for a calibration, reusing the layout pass's table cache."""
+        from .crosstalk_adaptive_layout import CrosstalkAdaptiveContext
+
+        context = CrosstalkAdaptiveContext.from_backend(backend_prop, crosstalk_prop, table_cache)
+        return cls.from_tables(context.tables, context.crosstalk_model)
+
+    def log_esp(self, prog2hw, programs):
+        """Log ESP of each program and of the whole batch.
+
+        Args:
+            prog2hw (dict or ndarray): hardware qubit of each program qubit id
+            programs (ProgramArrays): output of :func:`program_arrays`
+
+        Returns:
+            tuple: (ndarray of per-program log ESP, batch log ESP)
+        """
+        if isinstance(prog2hw, dict):
+            hw_of = np.full(max(prog2hw, default=-1) + 1, -1)
+            hw_of[list(prog2hw)] = list(prog2hw.values())
+        else:
+            hw_of = np.asarray(prog2hw)
+        hw0 = hw_of[programs.edges[:, 0]]
+        hw1 = hw_of[programs.edges[:, 1]]
+
+        edge_log = self.log_swap_reliabs[hw0, hw1]
+        direct = self.coupling_mask[hw0, hw1]
+        if direct.any() and len(self._xtalk_source):
+            edge_log = edge_log.copy()
+            edge_log[direct] = self._log_crosstalk_reliab(hw0[direct], hw1[direct])
+
+        program_log = np.bincount(
+            programs.edge_program,
+            weights=programs.weights * edge_log,
+            minlength=programs.num_programs,
+        )
+        program_log += np.bincount(
+            programs.qubit_program,
+            weights=self.log_readout_reliability[hw_of[programs.qubits]],
+            minlength=programs.num_programs,
+        )
+        return program_log, float(program_log.sum())
+
+    def score(self, layout, prog_graphs, qubits):
+        """ESP of each program and of the batch for a ``Layout``.
+
+        Args:
+            layout (Layout): layout written by the layout pass
+            prog_graphs (list): program graphs of the layout pass
+            qubits (list): virtual qubits, indexed by program qubit id (``dag.qubits``)
+
+        Returns:
+            tuple: (ndarray of per-program ESP, batch ESP)
+        """
+        prog2hw = np.array([layout[q] for q in qubits], dtype=int)
+        program_log, batch_log = self.log_esp(prog2hw, program_arrays(prog_graphs))
+        return np.exp(program_log), float(np.exp(batch_log))
+
+    def _log_crosstalk_reliab(self, hw0, hw1):
+        """Log CNOT reliability of the used hardware edges under their mutual crosstalk."""
+        used_ids = self._xtalk_edge_ids[hw0, hw1]
+        active = np.zeros(len(self.crosstalk_model.edges), dtype=bool)
+        active[used_ids[used_ids >= 0]] = True
+        # an edge mapped several times still acts as one source of crosstalk
+        pairs = active[self._xtalk_source] & active[self._xtalk_target]
+        factor = np.ones(len(active))
+        np.multiply.at(factor, self._xtalk_target[pairs], self._xtalk_ratio[pairs])
+
+        cx_err = 1.0 - self.cx_reliabs[hw0, hw1]
+        edge_factor = np.where(used_ids >= 0, factor[used_ids], 1.0)
+        cx_err = np.where(edge_factor > 1.0, np.minimum(cx_err * edge_factor, 0.9999), cx_err)
+        with np.errstate(divide="ignore"):
+            return np.log(1.0 - cx_err)
@@ -0,0 +1,245 @@
+"""Simulated-annealing refinement of multi-program layouts."""
+import math
+import time
+
+import numpy as np
+from qiskit.transpiler.basepasses import AnalysisPass
+from qiskit.transpiler.exceptions import TranspilerError
+from qiskit.transpiler.layout import Layout
+
+from .crosstalk_adaptive_layout import CrosstalkAdaptiveContext
+from .esp_scorer import ESPScorer, program_arrays
+from .program_graph import program_graphs
+
+# log reliability used for a reliability of 0, so that score changes stay finite
+_MIN_LOG = -1e3
+
+
+class IncrementalESP:
+    """Batch log ESP of a layout, updated move by move.
+
+    The model is the one of ``ESPScorer``. A move swaps the contents of two
+    hardware qubits: two program qubits, or a program qubit and a free qubit.
+    Only the program edges at the moved qubits and the edges whose crosstalk
+    they switch on or off are scored again, so a move costs O(degree).
+    """
+
+    def __init__(self, scorer, programs, hw_of, num_hw_qubits):
+        """
+        Args:
+            scorer (ESPScorer): calibration tables
+            programs (ProgramArrays): output of ``program_arrays``
+            hw_of (ndarray): hardware qubit of each program qubit id
+            num_hw_qubits (int): number of hardware qubits
+        """
+        self.scorer = scorer
+        self.edges = programs.edges
+        self.weights = programs.weights
+        self.hw_of = np.array(hw_of, dtype=int)
+        self.prog_of = np.full(num_hw_qubits, -1)
+        self.prog_of[self.hw_of] = np.arange(len(self.hw_of))
+        self.log_readout = np.maximum(scorer.log_readout_reliability, _MIN_LOG)
+        self.counted = np.zeros(len(self.hw_of), dtype=bool)
+        self.counted[programs.qubits] = True
+        self.incident = [[] for _ in range(len(self.hw_of))]
+        self._pairs = self.edges.tolist()
+        for e, (q0, q1) in enumerate(self._pairs):
+            self.incident[q0].append(e)
+            self.incident[q1].append(e)
+
+        model = scorer.crosstalk_model
+        self._affects = [
+            (
+                model.affects_idx[start:stop].tolist(),
+                np.log(np.maximum(model.affects_ratio[start:stop], 1.0)).tolist(),
+            )
+            for start, stop in zip(model.affects_ptr[:-1].tolist(), model.affects_ptr[1:].tolist())
+        ]
+        self.log_factor = np.zeros(len(model.edges))
+        self.edge_at = np.full(len(model.edges), -1)
+        self.edge_source = np.full(len(self.edges), -1)
+        for e in range(len(self.edges)):
+            self._activate(e)
+        self.edge_log = np.array([self._edge_log(e) for e in range(len(self.edges))])
+        self.total = float(
+            (self.weights * self.edge_log).sum()
+            + self.log_readout[self.hw_of[self.counted]].sum()
+        )
+
+    def partners(self, qubit):
+        """Program qubits that share an edge with ``qubit``."""
+        partners = []
+        for e in self.incident[qubit]:
+            q0, q1 = self._pairs[e]
+            partners.append(q1 if q0 == qubit else q0)
+        return partners
+
+    def swap(self, h1, h2):
+        """Swap the contents of hardware qubits ``h1`` and ``h2``.
+
+        Calling it again with the same qubits undoes the move.
+
+        Returns:
+            float: change of the batch log ESP
+        """
+        p1, p2 = int(self.prog_of[h1]), int(self.prog_of[h2])
+        moved = [p for p in (p1, p2) if p >= 0]
+        touched = {e for p in moved for e in self.incident[p]}
+        dirty = set(touched)
+        for e in touched:
+            dirty |= self._deactivate(e)
+        self.prog_of[h1], self.prog_of[h2] = p2, p1
+        if p1 >= 0:
+            self.hw_of[p1] = h2
+        if p2 >= 0:
+            self.hw_of[p2] = h1
+        for e in touched:
+            dirty |= self._activate(e)
+
+        delta = 0.0
+        for p, old, new in ((p1, h1, h2), (p2, h2, h1)):
+            if p >= 0 and self.counted[p]:
+                delta += self.log_readout[new] - self.log_readout[old]
+        for e in dirty:
+            new_log = self._edge_log(e)
+            delta += self.weights[e] * (new_log - self.edge_log[e])
+            self.edge_log[e] = new_log
+        self.total += delta
+        return delta
+
+    def _crosstalk_id(self, e):
+        """Crosstalk model id of the hardware CNOT under program edge ``e``, or -1."""
+        q0, q1 = self._pairs[e]
+        h0, h1 = self.hw_of[q0], self.hw_of[q1]
+        if not self.scorer.coupling_mask[h0, h1]:
+            return -1
+        return int(self.scorer._xtalk_edge_ids[h0, h1])
+
+    def _activate(self, e):
+        """Switch on the crosstalk of edge ``e``; returns the edges it affects."""
+        source = self._crosstalk_id(e)
+        self.edge_source[e] = source
+        if source < 0:
+            return set()
+        self.edge_at[source] = e
+        return self._spread(source, 1.0)
+
+    def _deactivate(self, e):
+        """Switch off the crosstalk of edge ``e``; returns the edges it affected."""
+        source = self.edge_source[e]
+        self.edge_source[e] = -1
+        if source < 0:
+            return set()
+        self.edge_at[source] = -1
+        return self._spread(source, -1.0)
+
+    def _spread(self, source, sign):
+        affected = set()
+        for target, log_ratio in zip(*self._affects[source]):
+            self.log_factor[target] += sign * log_ratio
+            if self.edge_at[target] >= 0:
+                affected.add(int(self.edge_at[target]))
+        return affected
+
+    def _edge_log(self, e):
+        q0, q1 = self._pairs[e]
+        h0, h1 = self.hw_of[q0], self.hw_of[q1]
+        if not self.scorer.coupling_mask[h0, h1]:
+            return max(self.scorer.log_swap_reliabs[h0, h1], _MIN_LOG)
+        cx_err = 1.0 - self.scorer.cx_reliabs[h0, h1]
+        source = self.edge_source[e]
+        if source >= 0 and self.log_factor[source] > 0:
+            cx_err = min(cx_err * math.exp(self.log_factor[source]), 0.9999)
+        return math.log(1.0 - cx_err) if cx_err < 1.0 else _MIN_LOG
+
+
+class AnnealingLayoutRefinement(AnalysisPass):
+    """Refine ``property_set['layout']`` with simulated annealing.
+
+    Moves swap two program qubits, or move a program qubit to a free qubit,
+    next to the hardware qubit of the moved qubit or of one of its program
+    neighbours. Moves are accepted with the Metropolis rule on the change of
+    the batch log ESP (``IncrementalESP``), under a geometric cooling
+    schedule. The best layout seen is kept.
+    """
+
+    def __init__(self, backend_prop, crosstalk_prop=None, max_iterations=10000, time_budget=None,
+                 initial_temperature=0.05, final_temperature=1e-4, seed=None,
+                 table_cache=None, context=None):
+        """AnnealingLayoutRefinement initializer.
+
+        Args:
+            backend_prop (BackendProperties): backend calibration
+            crosstalk_prop (dict or CrosstalkModel): crosstalk table {(i, j): {(k, l): ratio}}
+            max_iterations (int): number of proposed moves
+            time_budget (float): wall-clock seconds for the search, None for no limit
+            initial_temperature (float): temperature of the first move, in log ESP
+            final_temperature (float): temperature of the last move
+            seed (int): seed of the move proposals
+            table_cache (BackendTableCache): cache of preprocessed backend tables
+            context (CrosstalkAdaptiveContext): backend tables shared with a layout pass
+        """
+        super().__init__()
+        if context is None:
+            context = CrosstalkAdaptiveContext.from_backend(
+                backend_prop, crosstalk_prop, table_cache
+            )
+        self.context = context
+        self.scorer = ESPScorer.from_tables(context.tables, context.crosstalk_model)
+        self.max_iterations = max_iterations
+        self.time_budget = time_budget
+        self.initial_temperature = initial_temperature
+        self.final_temperature = final_temperature
+        self.seed = seed
+
+    def refine(self, dag, layout):
+        """Return the refined layout of ``dag``, starting from ``layout``."""
+        programs = program_arrays(program_graphs(dag))
+        hw_of = np.array([layout[q] for q in dag.qubits], dtype=int)
+        esp = IncrementalESP(self.scorer, programs, hw_of, self.context.num_hw_qubits)
+        best_total, best_hw_of = esp.total, esp.hw_of.copy()
+
+        tables = self.context.tables
+        usable = tables["available_mask"]
+        neighbors = [
+            row[mask].tolist() for row, mask in zip(tables["neighbor_index"], tables["neighbor_mask"])
+        ]
+        movable = np.unique(programs.edges).tolist()
+        rng = np.random.default_rng(self.seed)
+        deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+        cooling = self.final_temperature / self.initial_temperature
+
+        for iteration in range(self.max_iterations if movable else 0):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            temperature = self.initial_temperature * cooling ** (
+                iteration / max(self.max_iterations - 1, 1)
+            )
+            qubit = movable[rng.integers(len(movable))]
+            h1 = int(esp.hw_of[qubit])
+            partners = esp.partners(qubit)
+            anchor = h1 if rng.random() < 0.5 else int(esp.hw_of[rng.choice(partners)])
+            if not neighbors[anchor]:
+                continue
+            h2 = neighbors[anchor][rng.integers(len(neighbors[anchor]))]
+            if h2 == h1 or not usable[h2]:
+                continue
+
+            delta = esp.swap(h1, h2)
+            if delta >= 0 or rng.random() < math.exp(delta / temperature):
+                if esp.total > best_total:
+                    best_total, best_hw_of = esp.total, esp.hw_of.copy()
+            else:
+                esp.swap(h1, h2)
+
+        # the incremental total drifts slightly, so compare with full scores
+        if self.scorer.log_esp(best_hw_of, programs)[1] <= self.scorer.log_esp(hw_of, programs)[1]:
+            best_hw_of = hw_of
+        return Layout({q: int(best_hw_of[i]) for i, q in enumerate(dag.qubits)})
+
+    def run(self, dag):
+        """Run the AnnealingLayoutRefinement pass on `dag`."""
+        layout = self.property_set["layout"]
+        if layout is None:
+            raise TranspilerError("AnnealingLayoutRefinement needs a layout to refine.")
+        self.property_set["layout"] = self.refine(dag, layout)
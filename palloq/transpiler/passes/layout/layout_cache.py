@@ -0,0 +1,80 @@
+"""Memo cache of layouts keyed by program structure and calibration."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def batch_fingerprint(prog_graphs, num_qubits):
+    """Structural fingerprint of a composed batch.
+
+    Two batches share a fingerprint when they have the same number of virtual
+    qubits and the same programs, by ``ProgramGraph.fingerprint``, in the same
+    placement order. Register names and the positions of the programs in the
+    DAG do not matter.
+
+    Args:
+        prog_graphs (list): ProgramGraph of each program, in placement order
+        num_qubits (int): number of virtual qubits of the batch
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256(str(num_qubits).encode())
+    for prog_graph in prog_graphs:
+        digest.update(prog_graph.fingerprint.encode())
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """LRU cache of placements of ``CrosstalkAdaptiveMultiLayout``.
+
+    An entry holds, for each program of a batch, the hardware qubits of its
+    nodes in ascending order, the hardware qubits of the virtual qubits
+    without two-qubit gates and the hardware CNOTs whose crosstalk was taken
+    into account. It can be laid onto any batch with the same fingerprint,
+    whatever its qubit objects.
+    """
+
+    def __init__(self, maxsize=128):
+        """
+        Args:
+            maxsize (int): number of placements kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._placements = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._placements)
+
+    def get(self, key):
+        """Return the placement stored under ``key``, or None on a miss."""
+        with self._lock:
+            placement = self._placements.get(key)
+            if placement is None:
+                self.misses += 1
+                return None
+            self._placements.move_to_end(key)
+            self.hits += 1
+            return placement
+
+    def put(self, key, placement):
+        """Store ``placement`` (see ``CrosstalkAdaptiveState._placement``) under ``key``."""
+        with self._lock:
+            self._placements[key] = placement
+            self._placements.move_to_end(key)
+            while len(self._placements) > self.maxsize:
+                self._placements.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._placements.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# shared by every CrosstalkAdaptiveMultiLayout that is not given its own cache
+layout_cache = LayoutCache()
@@ -0,0 +1,65 @@
+"""Frontier of program edges that are waiting to be placed."""
+import heapq
+from collections import defaultdict
+
+
+class ProgramEdgeFrontier:
+    """Pending program edges indexed by program qubit.
+
+    Edges keep the priority order they are given in. The next edge is the
+    first pending edge with exactly one mapped endpoint, or the first pending
+    edge if there is none. An edge retires once both endpoints are mapped.
+
+    Edges touching a mapped qubit sit in a heap ordered by priority, and each
+    qubit knows its incident edges, so selecting and retiring an edge does not
+    rescan the pending list.
+    """
+
+    def __init__(self, edges, mapped=()):
+        """
+        Args:
+            edges (list): program edges ``(q0, q1, ...)`` in priority order
+            mapped (iterable): program qubits that are already placed
+        """
+        self.edges = edges
+        self.adjacency = defaultdict(list)
+        for pos, edge in enumerate(edges):
+            self.adjacency[edge[0]].append(pos)
+            self.adjacency[edge[1]].append(pos)
+        self.mapped = set()
+        self._retired = [False] * len(edges)
+        self._remaining = len(edges)
+        self._frontier = []
+        self._next = 0
+        for qubit in mapped:
+            self.mark_mapped(qubit)
+
+    def __len__(self):
+        return self._remaining
+
+    def next_edge(self):
+        """The next edge to place, or None if every edge is placed."""
+        while self._frontier and self._retired[self._frontier[0]]:
+            heapq.heappop(self._frontier)
+        if self._frontier:
+            return self.edges[self._frontier[0]]
+        while self._next < len(self.edges) and self._retired[self._next]:
+            self._next += 1
+        if self._next < len(self.edges):
+            return self.edges[self._next]
+        return None
+
+    def mark_mapped(self, qubit):
+        """Record that ``qubit`` is placed and update the incident edges."""
+        if qubit in self.mapped:
+            return
+        self.mapped.add(qubit)
+        for pos in self.adjacency.get(qubit, ()):
+            if self._retired[pos]:
+                continue
+            edge = self.edges[pos]
+            if edge[0] in self.mapped and edge[1] in self.mapped:
+                self._retired[pos] = True
+                self._remaining -= 1
+            else:
+                heapq.heappush(self._frontier, pos)
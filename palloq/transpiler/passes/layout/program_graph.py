@@ -0,0 +1,108 @@
+"""Interaction graphs of the programs in a multi-programming batch."""
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+class ProgramGraph:
+    """Interaction graph of one program on integer program qubit ids.
+
+    Program qubit ids are the positions of the virtual qubits in ``dag.qubits``.
+    Two qubits share an edge if they take part in a two-qubit gate, weighted by
+    the number of such gates.
+
+    ``fingerprint`` hashes the graph with its nodes renumbered 0, 1, ... in
+    ascending order. The same program placed elsewhere in a batch, or under
+    other register names, has the same fingerprint.
+    """
+
+    def __init__(self, edges, weights):
+        """
+        Args:
+            edges (ndarray): (E, 2) program qubit ids with ``edges[:, 0] < edges[:, 1]``
+            weights (ndarray): (E,) number of two-qubit gates on each edge
+        """
+        self.edges = edges
+        self.weights = weights
+        self.nodes = np.unique(edges)
+        self._adjacency = defaultdict(list)
+        for q0, q1 in edges.tolist():
+            self._adjacency[q0].append(q1)
+            self._adjacency[q1].append(q0)
+        canonical = np.concatenate(
+            [[len(self.nodes)], np.searchsorted(self.nodes, edges).ravel(), weights]
+        )
+        self.fingerprint = hashlib.sha256(canonical.astype(np.int64).tobytes()).hexdigest()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def volume(self):
+        """Total edge weight times the number of qubits."""
+        return int(self.weights.sum()) * len(self.nodes)
+
+    def neighbors(self, qubit):
+        """Program qubits that share an edge with ``qubit``."""
+        return self._adjacency.get(qubit, [])
+
+    def placement_order(self):
+        """Edges as ``(q0, q1, weight)``, heaviest first.
+
+        Edges of equal weight are ordered by qubit ids, so the order does not
+        depend on the order of the gates.
+        """
+        order = np.lexsort((self.edges[:, 1], self.edges[:, 0], -self.weights))
+        return [
+            (q0, q1, weight)
+            for (q0, q1), weight in zip(self.edges[order].tolist(), self.weights[order].tolist())
+        ]
+
+
+def program_graphs(dag):
+    """Split the interaction graph of ``dag`` into the graphs of its programs.
+
+    Every connected component is one program. Programs are returned by
+    decreasing volume; programs of equal volume keep the order of their first
+    two-qubit gate in the DAG.
+
+    Args:
+        dag (DAGCircuit): composed batch of programs
+
+    Returns:
+        list: ProgramGraph of each program
+    """
+    num_qubits = len(dag.qubits)
+    qubit_ids = {q: i for i, q in enumerate(dag.qubits)}
+    pairs = np.array(
+        [(qubit_ids[gate.qargs[0]], qubit_ids[gate.qargs[1]]) for gate in dag.two_qubit_ops()],
+        dtype=int,
+    ).reshape(-1, 2)
+    if not len(pairs):
+        return []
+    pairs.sort(axis=1)
+
+    keys, first_gate, weights = np.unique(
+        pairs[:, 0] * num_qubits + pairs[:, 1], return_index=True, return_counts=True
+    )
+    edges = np.stack(np.divmod(keys, num_qubits), axis=1)
+
+    adjacency = coo_matrix(
+        (np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(num_qubits, num_qubits)
+    )
+    _, labels = connected_components(adjacency, directed=False)
+    edge_labels = labels[edges[:, 0]]
+    component_start = np.full(labels.max() + 1, len(pairs))
+    np.minimum.at(component_start, edge_labels, first_gate)
+
+    graphs = []
+    for label in np.argsort(component_start, kind="stable"):
+        if component_start[label] == len(pairs):
+            # qubits without two-qubit gates
+            break
+        in_component = edge_labels == label
+        graphs.append(ProgramGraph(edges[in_component], weights[in_component]))
+    return sorted(graphs, key=lambda graph: graph.volume, reverse=True)
@@ -0,0 +1,67 @@
+"""Availability of hardware qubits during layout."""
+import numpy as np
+
+
+class QubitAvailability:
+    """Set of free hardware qubits backed by a NumPy boolean mask.
+
+    Membership and removal are O(1), and the mask can be applied to whole
+    arrays of qubits or edges at once. ``snapshot`` / ``restore`` make it
+    cheap to branch a layout search from an intermediate state.
+    """
+
+    def __init__(self, num_qubits, qubits=()):
+        """
+        Args:
+            num_qubits (int): number of hardware qubits
+            qubits (iterable): qubits that are initially available
+        """
+        self.mask = np.zeros(num_qubits, dtype=bool)
+        self.mask[list(qubits)] = True
+        self._count = int(self.mask.sum())
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Wrap an existing boolean mask (the mask is copied)."""
+        availability = cls(len(mask))
+        availability.mask[:] = mask
+        availability._count = int(availability.mask.sum())
+        return availability
+
+    def __contains__(self, qubit):
+        return bool(self.mask[qubit])
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return iter(self.qubits().tolist())
+
+    def remove(self, qubit):
+        """Mark ``qubit`` as used. Raises ValueError if it is not available."""
+        if not self.mask[qubit]:
+            raise ValueError("hardware qubit {} is not available".format(qubit))
+        self.mask[qubit] = False
+        self._count -= 1
+
+    def first(self):
+        """Lowest-numbered available qubit."""
+        return int(np.argmax(self.mask)) if self._count else None
+
+    def qubits(self):
+        """Available qubits in ascending order."""
+        return np.flatnonzero(self.mask)
+
+    def edge_mask(self, edges):
+        """Boolean mask of the ``(E, 2)`` edge array whose endpoints are both free."""
+        edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+        return self.mask[edges[:, 0]] & self.mask[edges[:, 1]]
+
+    def snapshot(self):
+        """Copy of the current state for ``restore``."""
+        return self.mask.copy()
+
+    def restore(self, snapshot):
+        """Return to a state taken with ``snapshot``."""
+        self.mask[:] = snapshot
+        self._count = int(self.mask.sum())
@@ -0,0 +1,115 @@
+"""Partition-first multi-program layout for large devices."""
+import numpy as np
+
+from .crosstalk_adaptive_layout import CrosstalkAdaptiveMultiLayout, _log_reliab
+
+
+def grow_region(log_gate, free, blocked, seed, size):
+    """Grow a connected region of ``size`` free qubits from ``seed``.
+
+    Each step adds the free qubit with the most reliable CNOT into the region
+    (Prim's algorithm on log gate reliabilities). Qubits in ``blocked`` are
+    only taken when no other qubit can be reached.
+
+    Args:
+        log_gate (ndarray): n x n log gate reliability, -inf where there is no CNOT
+        free (ndarray): mask of the available qubits
+        blocked (ndarray): mask of the available qubits next to other regions
+        seed (int): first qubit of the region
+        size (int): number of qubits in the region
+
+    Returns:
+        tuple: (region mask, log reliability of its spanning tree, True if the
+        region has no blocked qubit), or None if fewer than ``size`` qubits
+        can be reached
+    """
+    region = np.zeros(len(free), dtype=bool)
+    region[seed] = True
+    link = log_gate[seed].copy()
+    score = 0.0
+    for _ in range(size - 1):
+        candidates = np.where(free & ~region, link, -np.inf)
+        preferred = np.where(blocked, -np.inf, candidates)
+        qubit = int(np.argmax(preferred))
+        if preferred[qubit] == -np.inf:
+            qubit = int(np.argmax(candidates))
+            if candidates[qubit] == -np.inf:
+                return None
+        score += candidates[qubit]
+        region[qubit] = True
+        np.maximum(link, log_gate[qubit], out=link)
+    return region, score, not (region & blocked).any()
+
+
+class RegionPartitionedMultiLayout(CrosstalkAdaptiveMultiLayout):
+    """Place every program inside its own region of the coupling graph.
+
+    Programs are taken in placement order. Each one gets a connected region
+    of free qubits of its size, grown by ``grow_region`` from several seed
+    qubits. The region with the most reliable spanning tree wins, and regions
+    that do not touch an earlier region come first, so programs stay apart
+    and crosstalk stays low. The gate reliabilities come from the run state
+    and include the crosstalk of the programs already placed.
+
+    The program is then placed inside its region like in
+    ``CrosstalkAdaptiveMultiLayout`` (greedy, or embedding for small
+    programs), so routing only needs SWAPs inside the region. When no free
+    region is large enough, the program is placed on the whole device.
+    """
+
+    def __init__(self, backend_prop, crosstalk_prop=None, max_seeds=None, **kwargs):
+        """RegionPartitionedMultiLayout initializer.
+
+        Args:
+            backend_prop (BackendProperties): backend calibration
+            crosstalk_prop (dict or CrosstalkModel): crosstalk table {(i, j): {(k, l): ratio}}
+            max_seeds (int): seed qubits tried per region, those with the most
+                reliable CNOT first. None tries every free qubit.
+            **kwargs: options of ``CrosstalkAdaptiveMultiLayout``. ``num_starts``
+                is not used.
+        """
+        super().__init__(backend_prop, crosstalk_prop, **kwargs)
+        self.max_seeds = max_seeds
+
+    def _cache_options(self):
+        return super()._cache_options() + (self.max_seeds,)
+
+    def _place(self, state):
+        """Place each program graph of ``state`` inside its own region."""
+        for prog_graph in state.prog_graphs:
+            region = self._select_region(state, len(prog_graph))
+            if region is None:
+                # the free qubits are too fragmented, place on the whole device
+                region = state.available_hw_qubits.mask.copy()
+            outside = state.available_hw_qubits.mask & ~region
+            state.available_hw_qubits.restore(region)
+            # the CNOT heap drops unavailable qubits for good, so rebuild it per region
+            state._build_cx_heap()
+            state._place_program(prog_graph, **self.placement_options)
+            state.available_hw_qubits.restore(outside | state.available_hw_qubits.mask)
+        state._place_idle_qubits()
+
+    def _select_region(self, state, size):
+        """Mask of the best free region of ``size`` qubits, or None."""
+        free = state.available_hw_qubits.mask
+        used = np.zeros(state.num_hw_qubits, dtype=bool)
+        used[list(state.prog2hw.values())] = True
+        blocked = free & state.coupling_mask[:, used].any(axis=1)
+
+        readout = state.readout_reliability
+        gate = state.cx_reliabs * readout[:, None] * readout[None, :]
+        log_gate = np.where(state.coupling_mask, _log_reliab(np.maximum(gate, gate.T)), -np.inf)
+
+        seeds = np.flatnonzero(free)
+        if self.max_seeds is not None:
+            order = np.argsort(-log_gate[seeds].max(axis=1, initial=-np.inf), kind="stable")
+            seeds = seeds[order[: self.max_seeds]]
+
+        best = None
+        for seed in seeds.tolist():
+            grown = grow_region(log_gate, free, blocked, seed, size)
+            if grown is None:
+                continue
+            if best is None or (grown[2], grown[1]) > (best[2], best[1]):
+                best = grown
+        return None if best is None else best[0]
@@ -0,0 +1,33 @@
+"""All-pairs shortest paths for the swap cost graph.
+
+Swap costs only depend on the calibration, so the tables are computed once
+per backend (and cached with the other backend tables).
+"""
+import numpy as np
+
+
+def floyd_warshall(weights):
+    """Vectorized Floyd-Warshall.
+
+    Each pivot is a single min-plus update over all rows of the matrix.
+
+    Args:
+        weights (ndarray): n x n edge weights, ``inf`` where there is no edge
+
+    Returns:
+        tuple: (pred, dist) where ``pred[s, t]`` is the predecessor of ``t`` on
+        a shortest path from ``s`` (-1 if there is none) and ``dist`` is the
+        n x n distance matrix.
+    """
+    num_nodes = weights.shape[0]
+    dist = np.array(weights, dtype=float)
+    np.fill_diagonal(dist, 0.0)
+    pred = np.where(np.isfinite(dist), np.arange(num_nodes)[:, None], -1)
+    np.fill_diagonal(pred, -1)
+    for k in range(num_nodes):
+        # row k and column k are fixed points of this update, so it is safe in place
+        via_k = dist[:, k, None] + dist[None, k, :]
+        better = via_k < dist
+        np.copyto(dist, via_k, where=better)
+        np.copyto(pred, np.broadcast_to(pred[k], pred.shape), where=better)
+    return pred, dist
@@ -1 +1,4 @@
-from .multi_alap import MultiALAPSchedule
\ No newline at end of file
+from .base_multi_schedule import BaseMultiSchedule
+from .multi_alap import MultiALAPSchedule
+from .multi_asap import MultiASAPSchedule
+from .dynamical_decoupling import MultiDynamicalDecoupling
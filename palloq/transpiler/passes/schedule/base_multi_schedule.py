@@ -0,0 +1,246 @@
+"""Common core of the multi-program schedulers."""
+import numpy as np
+from qiskit.circuit.delay import Delay
+from qiskit.dagcircuit import DAGCircuit
+from qiskit.transpiler.basepasses import TransformationPass
+from qiskit.transpiler.exceptions import TranspilerError
+
+from .crosstalk_serialization import CrosstalkSerializer
+from .duration_table import duration_table_cache
+from .program_alignment import (ALIGNMENTS, alignment_offsets, merge_programs, qubit_programs,
+                                split_barriers)
+from .qubit_timeline import QubitTimeline
+from .schedule_array import schedule_array
+
+
+class BaseMultiSchedule(TransformationPass):
+    """Schedule every node as early as possible in one traversal direction.
+
+    The timing kernel walks the topological order once, forward for ASAP or
+    backward for ALAP (``reverse``), and stores the times of each node in flat
+    per-node lists. Times are measured from the start of the circuit for a
+    forward walk and back from its end for a backward walk. The scheduled DAG
+    is then built in a single forward pass: each node is appended after the
+    delays that separate it from the previous node on its qubits, and trailing
+    delays close every qubit at the circuit duration.
+
+    With a crosstalk table, a CNOT that would run together with a CNOT of a
+    crosstalk pair may be delayed past it (see ``CrosstalkSerializer``). The
+    DAG must then be laid out on physical qubits.
+
+    With an ``alignment``, every program of the batch (one register per
+    program, see ``qubit_programs``) is shifted as a whole to the start or the
+    end of the circuit, or centred on the longest program. Barriers across
+    programs are split per program so that they do not tie programs together.
+
+    The busy intervals of every qubit are published as a ``QubitTimeline`` in
+    ``property_set['qubit_timeline']``, and the scheduled instructions with
+    their program ids as a structured array in ``property_set['schedule_array']``
+    (see ``schedule_array``).
+    """
+
+    # walk the topological order backward, i.e. schedule as late as possible
+    reverse = False
+
+    def __init__(self, durations, crosstalk_prop=None, backend_prop=None, table_cache=None,
+                 alignment=None):
+        """
+        Args:
+            durations (InstructionDurations): Durations of instructions to be used in scheduling
+            crosstalk_prop (dict or CrosstalkModel): crosstalk table {(i, j): {(k, l): ratio}}
+                to serialize CNOTs of crosstalk pairs, None to ignore crosstalk
+            backend_prop (BackendProperties): backend calibration, needed with ``crosstalk_prop``
+            table_cache (DurationTableCache): cache of compiled duration tables,
+                shared by default
+            alignment (str): per-program alignment, 'start', 'end' or 'center'. None
+                schedules the whole batch in the traversal direction.
+
+        Raises:
+            TranspilerError: if the alignment is unknown.
+        """
+        super().__init__()
+        self.durations = durations
+        self.crosstalk_prop = crosstalk_prop
+        self.backend_prop = backend_prop
+        self.table_cache = duration_table_cache if table_cache is None else table_cache
+        if alignment is not None and alignment not in ALIGNMENTS:
+            raise TranspilerError("Invalid program alignment %s." % alignment)
+        self.alignment = alignment
+
+    def run(self, dag, time_unit=None):  # pylint: disable=arguments-differ
+        """Run the scheduling pass on `dag`.
+        Args:
+            dag (DAGCircuit): DAG to schedule.
+            time_unit (str): Time unit to be used in scheduling: 'dt' or 's'.
+        Returns:
+            DAGCircuit: A scheduled DAG.
+        """
+        if not time_unit:
+            time_unit = self.property_set['time_unit']
+
+        nodes = list(dag.topological_op_nodes())
+        qubit_ids = {q: i for i, q in enumerate(dag.qubits)}
+        programs = merge_programs(nodes, qubit_ids,
+                                  qubit_programs(dag, self.property_set['layout']))
+        if self.alignment is None:
+            times = self._node_times(dag, nodes, time_unit)
+        else:
+            nodes, times = self._aligned_times(dag, nodes, qubit_ids, programs, time_unit)
+        starts, durations, stops, circuit_duration = times
+
+        new_dag = DAGCircuit()
+        for qreg in dag.qregs.values():
+            new_dag.add_qreg(qreg)
+        for creg in dag.cregs.values():
+            new_dag.add_creg(creg)
+
+        if self.reverse:
+            # a node occupies [stop, start] counted back from the end
+            first_edges, last_edges, origin, end = stops, starts, circuit_duration, 0
+        else:
+            first_edges, last_edges, origin, end = starts, stops, 0, circuit_duration
+
+        delays = ([], [], [], [])
+
+        def pad_with_delay(q, until):
+            """Pad ``q`` with a delay from its last node until ``until``."""
+            idle_duration = qubit_cursor[q] - until if self.reverse else until - qubit_cursor[q]
+            if idle_duration > 0:
+                delay = new_dag.apply_operation_back(Delay(idle_duration, time_unit), [q], [])
+                start = circuit_duration - qubit_cursor[q] if self.reverse else qubit_cursor[q]
+                for column, value in zip(delays, (qubit_ids[q], start, idle_duration, delay)):
+                    column.append(value)
+
+        qubit_cursor = dict.fromkeys(new_dag.qubits, origin)
+        new_nodes = []
+        for i, node in enumerate(nodes):
+            for q in node.qargs:
+                pad_with_delay(q, first_edges[i])
+                qubit_cursor[q] = last_edges[i]
+
+            new_node = new_dag.apply_operation_back(node.op, node.qargs, node.cargs,
+                                                    node.condition)
+            # set duration for each instruction (tricky but necessary)
+            new_node.op.duration = durations[i]
+            new_node.op.unit = time_unit
+            new_nodes.append(new_node)
+
+        for q in new_dag.qubits:
+            pad_with_delay(q, end)
+
+        if self.reverse:
+            # back from the end of the circuit to forward times
+            starts, stops = (np.subtract(circuit_duration, stops),
+                             np.subtract(circuit_duration, starts))
+        self.property_set['qubit_timeline'] = self._timeline(
+            qubit_ids, nodes, new_nodes, starts, stops, circuit_duration, delays, programs
+        )
+        self.property_set['schedule_array'] = schedule_array(nodes, qubit_ids, programs, starts,
+                                                             durations, time_unit)
+
+        new_dag.name = dag.name
+        new_dag.duration = circuit_duration
+        new_dag.unit = time_unit
+        return new_dag
+
+    @staticmethod
+    def _timeline(qubit_ids, nodes, new_nodes, starts, stops, circuit_duration, delays,
+                  programs):
+        """QubitTimeline of the scheduled nodes and of the delays between them."""
+        node_ids = [i for i, node in enumerate(nodes) if not isinstance(node.op, Delay)]
+        arity = [len(nodes[i].qargs) for i in node_ids]
+        return QubitTimeline(
+            len(qubit_ids),
+            circuit_duration,
+            [qubit_ids[q] for i in node_ids for q in nodes[i].qargs],
+            np.repeat(node_ids, arity),
+            np.repeat(np.asarray(starts)[node_ids], arity),
+            np.repeat(np.asarray(stops)[node_ids], arity),
+            new_nodes,
+            delays,
+            programs,
+        )
+
+    def _aligned_times(self, dag, nodes, qubit_ids, programs, time_unit):
+        """Node times with every program aligned as ``self.alignment``.
+
+        Args:
+            dag (DAGCircuit): DAG of ``nodes``
+            nodes (list[DAGNode]): op nodes in topological order
+            qubit_ids (dict): position of each qubit in ``dag.qubits``
+            programs (ndarray): program id of each qubit, see ``merge_programs``
+            time_unit (str): time unit of the durations
+
+        Returns:
+            tuple: (nodes with barriers split per program, output of ``_node_times``)
+        """
+        nodes = split_barriers(nodes, qubit_ids, programs)
+        starts, durations, stops, circuit_duration = self._node_times(dag, nodes, time_unit,
+                                                                      serialize=False)
+        node_programs = programs[[qubit_ids[node.qargs[0]] for node in nodes]]
+        starts, stops = np.asarray(starts), np.asarray(stops)
+        if self.reverse:
+            forward_starts, forward_stops = circuit_duration - stops, circuit_duration - starts
+        else:
+            forward_starts, forward_stops = starts, stops
+        offsets = alignment_offsets(node_programs, forward_starts, forward_stops,
+                                    circuit_duration, self.alignment,
+                                    integral=time_unit == 'dt',
+                                    num_programs=int(programs.max()) + 1)
+        # counted back from the end, a program moves the other way
+        shifts = -offsets if self.reverse else offsets
+
+        if not self.crosstalk_prop:
+            shift = shifts[node_programs]
+            return nodes, ((starts + shift).tolist(), durations, (stops + shift).tolist(),
+                           circuit_duration)
+
+        # serialization depends on the overlaps between programs, so schedule
+        # again with every program released at its aligned start
+        scheduled = np.bincount(node_programs, minlength=len(shifts)) > 0
+        first = np.full(len(shifts), circuit_duration, dtype=starts.dtype)
+        np.minimum.at(first, node_programs, starts)
+        release = (first + shifts).tolist()
+        qubit_release = {
+            q: release[program]
+            for q, program in zip(dag.qubits, programs.tolist())
+            if scheduled[program]
+        }
+        return nodes, self._node_times(dag, nodes, time_unit, release=qubit_release)
+
+    def _node_times(self, dag, nodes, time_unit, serialize=True, release=None):
+        """Timing kernel: start and stop times of ``nodes`` in the traversal direction.
+
+        Args:
+            dag (DAGCircuit): DAG of ``nodes``
+            nodes (list[DAGNode]): op nodes in topological order
+            time_unit (str): time unit of the durations
+            serialize (bool): serialize CNOTs of crosstalk pairs, if there is a crosstalk table
+            release (dict): earliest time of each qubit in the traversal direction
+
+        Returns:
+            tuple: (start times, durations, stop times, circuit duration), the
+            first three as flat lists indexed like ``nodes``
+        """
+        starts = [0] * len(nodes)
+        durations = self.table_cache.table(self.durations, time_unit).lookup(nodes)
+        stops = [0] * len(nodes)
+        qubit_time_available = dict(release or {})
+        serializer = None
+        if serialize and self.crosstalk_prop:
+            serializer = CrosstalkSerializer(self.crosstalk_prop, self.backend_prop, time_unit,
+                                             dt=self.durations.dt)
+            qubit_ids = {q: i for i, q in enumerate(dag.qubits)}
+        order = range(len(nodes) - 1, -1, -1) if self.reverse else range(len(nodes))
+        for i in order:
+            node = nodes[i]
+            start_time = max(qubit_time_available.get(q, 0) for q in node.qargs)
+            duration = durations[i]
+            if serializer is not None and node.name == 'cx':
+                start_time = serializer.schedule([qubit_ids[q] for q in node.qargs],
+                                                 start_time, duration)
+            stop_time = start_time + duration
+            starts[i], stops[i] = start_time, stop_time
+            for q in node.qargs:
+                qubit_time_available[q] = stop_time
+        return starts, durations, stops, max(qubit_time_available.values())
@@ -0,0 +1,147 @@
+"""Serialization of simultaneous CNOTs on crosstalk pairs."""
+import math
+from bisect import bisect_right
+from collections import defaultdict
+
+from qiskit.transpiler.exceptions import TranspilerError
+
+from palloq.transpiler.crosstalk_model import CrosstalkModel, _sorted_edge
+
+# largest CNOT error under crosstalk, as in the layout passes
+_MAX_ERROR = 0.9999
+
+
+class EdgeIntervalIndex:
+    """Time intervals of the scheduled CNOTs, indexed by crosstalk edge.
+
+    CNOTs on one edge share their qubits and never overlap in time, so the
+    intervals of an edge are disjoint and sorted by both start and stop. An
+    overlap query is a binary search followed by a walk over the intervals
+    that actually overlap.
+    """
+
+    def __init__(self):
+        self._starts = defaultdict(list)
+        self._stops = defaultdict(list)
+
+    def add(self, edge_id, start, stop):
+        """Record a CNOT on ``edge_id`` from ``start`` to ``stop``."""
+        starts, stops = self._starts[edge_id], self._stops[edge_id]
+        i = bisect_right(starts, start)
+        starts.insert(i, start)
+        stops.insert(i, stop)
+
+    def overlapping(self, edge_id, start, stop):
+        """Intervals ``(start, stop)`` on ``edge_id`` that overlap ``[start, stop)``."""
+        starts, stops = self._starts.get(edge_id), self._stops.get(edge_id)
+        if not starts:
+            return []
+        i = bisect_right(stops, start)
+        overlaps = []
+        while i < len(starts) and starts[i] < stop:
+            overlaps.append((starts[i], stops[i]))
+            i += 1
+        return overlaps
+
+
+class CrosstalkSerializer:
+    """Decide when a CNOT waits for the CNOTs it has crosstalk with.
+
+    The cost of running two CNOTs of a crosstalk pair together is the loss of
+    log fidelity of both gates, whose errors are multiplied by the ratio of
+    the crosstalk model. The cost of waiting is the decoherence of the qubits
+    of the delayed CNOT, ``delay / min(T1, T2)`` per qubit as in qiskit's
+    ``CrosstalkAdaptiveSchedule``. A CNOT is delayed past the overlapping
+    CNOTs, possibly several times, to the start with the lowest total cost.
+    """
+
+    def __init__(self, crosstalk_prop, backend_prop, time_unit, dt=None):
+        """
+        Args:
+            crosstalk_prop (dict or CrosstalkModel): crosstalk table {(i, j): {(k, l): ratio}}
+            backend_prop (BackendProperties): backend calibration
+            time_unit (str): time unit of the schedule: 'dt' or 's'
+            dt (float): duration of dt in seconds
+
+        Raises:
+            TranspilerError: if times in dt cannot be converted to seconds.
+        """
+        if backend_prop is None:
+            raise TranspilerError("Crosstalk-aware scheduling needs backend properties.")
+        if time_unit == 'dt' and dt is None:
+            raise TranspilerError("Crosstalk-aware scheduling in dt needs the dt of the backend.")
+        self.crosstalk_model = CrosstalkModel.from_prop(crosstalk_prop)
+        self.index = EdgeIntervalIndex()
+
+        self._cx_errors = {}
+        for ginfo in backend_prop.gates:
+            if ginfo.gate == "cx":
+                for item in ginfo.parameters:
+                    if item.name == "gate_error":
+                        self._cx_errors[_sorted_edge(ginfo.qubits)] = item.value
+                        break
+        seconds = dt if time_unit == 'dt' else 1.0
+        self._decoherence_rates = [
+            seconds / min(backend_prop.t1(q), backend_prop.t2(q))
+            for q in range(len(backend_prop.qubits))
+        ]
+        self._pair_losses = {}
+
+    def schedule(self, qubits, start_time, duration):
+        """Start time of a CNOT on physical ``qubits`` ready at ``start_time``.
+
+        The CNOT is recorded in the interval index at the returned time.
+        """
+        edge_id = self.crosstalk_model.edge_id(qubits)
+        if edge_id is None:
+            return start_time
+        pair_losses = self._pair_losses.get(edge_id)
+        if pair_losses is None:
+            pair_losses = self._pair_losses[edge_id] = self._crosstalk_losses(edge_id)
+
+        rate = sum(self._decoherence_rates[q] for q in qubits)
+        best_start = candidate = start_time
+        loss, wait_until = self._overlap_loss(pair_losses, candidate, duration)
+        best_cost = loss
+        while loss > 0:
+            candidate = wait_until
+            delay_cost = (candidate - start_time) * rate
+            if delay_cost >= best_cost:
+                break
+            loss, wait_until = self._overlap_loss(pair_losses, candidate, duration)
+            if delay_cost + loss < best_cost:
+                best_start, best_cost = candidate, delay_cost + loss
+
+        self.index.add(edge_id, best_start, best_start + duration)
+        return best_start
+
+    def _overlap_loss(self, pair_losses, start, duration):
+        """Crosstalk loss of a CNOT at ``start`` and the latest stop of the CNOTs it overlaps."""
+        loss, wait_until = 0.0, start
+        for other, pair_loss in pair_losses:
+            for _, stop in self.index.overlapping(other, start, start + duration):
+                loss += pair_loss
+                wait_until = max(wait_until, stop)
+        return loss, wait_until
+
+    def _crosstalk_losses(self, edge_id):
+        """``(other edge id, log fidelity lost when both run together)`` for ``edge_id``."""
+        model = self.crosstalk_model
+        losses = defaultdict(float)
+        rows = (
+            (model.affects_ptr, model.affects_idx, model.affects_ratio, False),
+            (model.affected_by_ptr, model.affected_by_idx, model.affected_by_ratio, True),
+        )
+        for ptr, idx, ratios, on_self in rows:
+            start, stop = ptr[edge_id], ptr[edge_id + 1]
+            for other, ratio in zip(idx[start:stop].tolist(), ratios[start:stop].tolist()):
+                victim = edge_id if on_self else other
+                losses[other] += self._log_fidelity_loss(victim, ratio)
+        return list(losses.items())
+
+    def _log_fidelity_loss(self, edge_id, ratio):
+        error = self._cx_errors.get(tuple(self.crosstalk_model.edges[edge_id].tolist()), 0.0)
+        if ratio <= 1.0 or error <= 0.0:
+            return 0.0
+        error = min(error, _MAX_ERROR)
+        return math.log(1.0 - error) - math.log(1.0 - min(error * ratio, _MAX_ERROR))
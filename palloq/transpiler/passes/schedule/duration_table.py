@@ -0,0 +1,189 @@
+"""Instruction durations compiled into an array for the schedulers."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from qiskit.transpiler.exceptions import TranspilerError
+
+# table entry of a duration that is not defined or cannot be converted
+_MISSING = -1
+
+
+def durations_fingerprint(durations, unit):
+    """Content hash of ``durations`` converted to ``unit``.
+
+    Args:
+        durations (InstructionDurations): durations of the instructions
+        unit (str): time unit of the table: 'dt' or 's'
+
+    Returns:
+        str: hex digest that changes whenever an entry, dt or the unit does
+    """
+    items = (
+        unit,
+        durations.dt,
+        sorted(durations.duration_by_name.items()),
+        sorted(durations.duration_by_name_qubits.items()),
+    )
+    return hashlib.sha256(repr(items).encode()).hexdigest()
+
+
+class DurationTable:
+    """Durations of ``InstructionDurations`` in one unit, as a 2D array.
+
+    Rows are gate kinds (instruction names) and columns are the qubit tuples
+    with their own durations, followed by a default column for the duration
+    by name. Entries without a qubit-specific duration hold the default, so a
+    lookup is a single fancy index over all nodes of a DAG.
+
+    Durations that are not defined or cannot be converted (no dt) are looked
+    up with ``InstructionDurations.get`` instead, which raises the usual
+    ``TranspilerError``. Delays are converted the same way. Barriers take the
+    integer 0 of ``InstructionDurations.get`` in every unit.
+    """
+
+    def __init__(self, durations, unit):
+        """
+        Args:
+            durations (InstructionDurations): durations of the instructions
+            unit (str): time unit of the table: 'dt' or 's'
+        """
+        self.durations = durations
+        self.unit = unit
+        names = sorted(
+            set(durations.duration_by_name)
+            | {name for name, _ in durations.duration_by_name_qubits}
+        )
+        names = [name for name in names if name not in ('barrier', 'delay')]
+        self.kind_ids = {name: i for i, name in enumerate(names)}
+        self.kind_ids['barrier'] = len(names)
+        qargs = sorted({qubits for _, qubits in durations.duration_by_name_qubits})
+        self.qargs_ids = {qubits: i for i, qubits in enumerate(qargs)}
+        self.default_column = len(qargs)
+
+        values = [[_MISSING] * (len(qargs) + 1) for _ in range(len(names) + 1)]
+        values[-1] = [0] * (len(qargs) + 1)
+        for name, (duration, from_unit) in durations.duration_by_name.items():
+            if name in self.kind_ids and name != 'barrier':
+                values[self.kind_ids[name]][-1] = self._convert(duration, from_unit)
+        for (name, qubits), (duration, from_unit) in durations.duration_by_name_qubits.items():
+            if name in self.kind_ids and name != 'barrier':
+                values[self.kind_ids[name]][self.qargs_ids[qubits]] = self._convert(
+                    duration, from_unit
+                )
+        table = np.array(values)
+        self.table = np.where(table == _MISSING, table[:, -1:], table)
+        self.table.setflags(write=False)
+
+    def _convert(self, duration, from_unit):
+        try:
+            return self.durations._convert_unit(duration, from_unit, self.unit)
+        except TranspilerError:
+            return _MISSING
+
+    def lookup(self, nodes):
+        """Durations of ``nodes`` in the unit of the table.
+
+        Args:
+            nodes (list[DAGNode]): op nodes
+
+        Returns:
+            list: duration of each node, as returned by ``InstructionDurations.get``
+        """
+        kinds = np.array([self.kind_ids.get(node.name, _MISSING) for node in nodes], dtype=int)
+        columns = np.array(
+            [
+                self.qargs_ids.get(tuple(q.index for q in node.qargs), self.default_column)
+                for node in nodes
+            ],
+            dtype=int,
+        )
+        values = self.table[kinds, columns]
+        values[kinds == _MISSING] = _MISSING
+        durations = values.tolist()
+        for i in np.flatnonzero(values == _MISSING).tolist():
+            durations[i] = self.durations.get(nodes[i].op, nodes[i].qargs, unit=self.unit)
+        # the 's' table is float, but barriers keep the integer zero
+        for i in np.flatnonzero(kinds == self.kind_ids['barrier']).tolist():
+            durations[i] = 0
+        return durations
+
+    def gate_durations(self, name, qubits):
+        """Durations of the one-qubit gate ``name`` on each of ``qubits``.
+
+        Args:
+            name (str): instruction name
+            qubits (ndarray): physical qubits
+
+        Returns:
+            ndarray: duration on each qubit, in the unit of the table, and ``inf``
+            where the gate has no duration on the qubit; the array is only
+            promoted to float for an ``inf`` or a float duration
+        """
+        kind = self.kind_ids.get(name, _MISSING)
+        columns = np.array(
+            [self.qargs_ids.get((q,), self.default_column) for q in np.asarray(qubits).tolist()],
+            dtype=int,
+        )
+        if kind == _MISSING:
+            values = np.full(len(columns), _MISSING)
+        else:
+            values = self.table[kind, columns]
+        missing = np.flatnonzero(values == _MISSING).tolist()
+        if not missing:
+            return values
+        values = values.tolist()
+        for i in missing:
+            try:
+                values[i] = self.durations.get(name, int(qubits[i]), unit=self.unit)
+            except TranspilerError:
+                values[i] = np.inf
+        return np.array(values)
+
+
+class DurationTableCache:
+    """LRU cache of ``DurationTable`` keyed by ``durations_fingerprint``."""
+
+    def __init__(self, maxsize=16):
+        """
+        Args:
+            maxsize (int): number of tables kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def table(self, durations, unit):
+        """Return the table of ``durations`` in ``unit``, building it on a miss."""
+        key = durations_fingerprint(durations, unit)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        table = DurationTable(durations, unit)
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+        return table
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._tables.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# shared by every scheduler that is not given its own cache
+duration_table_cache = DurationTableCache()
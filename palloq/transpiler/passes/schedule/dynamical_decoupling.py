@@ -0,0 +1,170 @@
+"""Dynamical decoupling of the idle gaps of a scheduled multi-program circuit."""
+import math
+
+import numpy as np
+from qiskit.circuit import QuantumRegister
+from qiskit.circuit.delay import Delay
+from qiskit.circuit.library import U3Gate
+from qiskit.dagcircuit import DAGCircuit
+from qiskit.transpiler.basepasses import TransformationPass
+from qiskit.transpiler.exceptions import TranspilerError
+
+from .duration_table import duration_table_cache
+from .schedule_array import append_records
+
+# X and Y pulses in the u3 basis of the backends, so that they have durations
+_X = (math.pi, 0, math.pi)
+_Y = (math.pi, math.pi / 2, math.pi / 2)
+
+DD_SEQUENCES = {
+    'XX': (_X, _X),
+    'XY4': (_X, _Y, _X, _Y),
+}
+
+
+class MultiDynamicalDecoupling(TransformationPass):
+    """Replace long idle delays with a dynamical decoupling sequence.
+
+    Runs after ``MultiALAPSchedule`` or ``MultiASAPSchedule``, on the delays
+    they record in ``property_set['qubit_timeline']``. The gaps to decouple
+    are selected with one mask over all delays: longer than ``min_duration``
+    and long enough for the pulses. Gaps on qubits where a pulse has no
+    duration keep their delay. In a selected gap the pulses are spaced
+    evenly, with ``slack / 2n`` before the first and after the last pulse and
+    ``slack / n`` between pulses, where ``slack`` is the gap minus the ``n``
+    pulse durations. Shorter gaps keep their delay.
+
+    The pulses are added to the busy intervals of
+    ``property_set['qubit_timeline']`` and appended to
+    ``property_set['schedule_array']``. The replaced delays are removed from
+    the timeline; the delays around the pulses are not recorded, so they are
+    not decoupled again.
+
+    The named sequences are built from ``u3`` pulses.
+    """
+
+    def __init__(self, durations, dd_sequence='XY4', min_duration=0, skip_reset_qubits=True,
+                 table_cache=None):
+        """MultiDynamicalDecoupling initializer.
+
+        Args:
+            durations (InstructionDurations): durations of the instructions
+            dd_sequence (str or list): 'XX', 'XY4' (u3 pulses) or a list of one-qubit gates
+            min_duration (int or float): gaps up to this duration keep their delay, in
+                the time unit of the schedule
+            skip_reset_qubits (bool): do not decouple qubits before their first gate,
+                since they are still in the ground state
+            table_cache (DurationTableCache): cache of compiled duration tables,
+                shared by default
+
+        Raises:
+            TranspilerError: if the sequence is unknown.
+        """
+        super().__init__()
+        if isinstance(dd_sequence, str):
+            if dd_sequence not in DD_SEQUENCES:
+                raise TranspilerError("Invalid dynamical decoupling sequence %s." % dd_sequence)
+            dd_sequence = [U3Gate(*angles) for angles in DD_SEQUENCES[dd_sequence]]
+        self.durations = durations
+        self.dd_sequence = list(dd_sequence)
+        self.min_duration = min_duration
+        self.skip_reset_qubits = skip_reset_qubits
+        self.table_cache = duration_table_cache if table_cache is None else table_cache
+
+    def run(self, dag):
+        """Run the MultiDynamicalDecoupling pass on `dag`.
+
+        Args:
+            dag (DAGCircuit): DAG scheduled by a multi-program scheduler.
+
+        Returns:
+            DAGCircuit: the DAG with its long delays decoupled.
+
+        Raises:
+            TranspilerError: if the DAG has no qubit timeline.
+        """
+        timeline = self.property_set['qubit_timeline']
+        if timeline is None:
+            raise TranspilerError("MultiDynamicalDecoupling needs the qubit timeline of "
+                                  "MultiALAPSchedule or MultiASAPSchedule.")
+        unit = dag.unit
+        long_enough = timeline.delay_durations > self.min_duration
+        if self.skip_reset_qubits:
+            long_enough &= timeline.delay_starts > 0
+        candidates = np.flatnonzero(long_enough)
+
+        # pulse durations only for the candidate gaps, inf where there are none
+        table = self.table_cache.table(self.durations, unit)
+        qubits = timeline.delay_qubits[candidates]
+        pulses = np.stack(
+            [table.gate_durations(gate.name, qubits) for gate in self.dd_sequence]
+        ).reshape(len(self.dd_sequence), len(candidates))
+        slack = timeline.delay_durations[candidates] - pulses.sum(axis=0)
+        fits = slack >= 0
+        selected, pulses, slack = candidates[fits], pulses[:, fits], slack[fits]
+        if unit == 'dt':
+            pulses, slack = pulses.astype(int), slack.astype(int)
+
+        num_pulses = len(self.dd_sequence)
+        if unit == 'dt':
+            spacing = slack // num_pulses
+            begin = spacing // 2
+        else:
+            spacing = slack / num_pulses
+            begin = spacing / 2
+        end = slack - begin - spacing * (num_pulses - 1)
+
+        pulse_ops = []
+        for i, (delay, gaps) in enumerate(zip(selected.tolist(),
+                                              zip(begin.tolist(), spacing.tolist(), end.tolist()))):
+            sequence_dag = self._sequence_dag(pulses[:, i].tolist(), gaps, unit)
+            pulse_ops.extend(node.op for node in sequence_dag.op_nodes()
+                             if not isinstance(node.op, Delay))
+            dag.substitute_node_with_dag(timeline.delay_nodes[delay], sequence_dag)
+
+        # pulse k of a gap starts after the begin delay, k spacings and the k pulses before it
+        index = np.arange(num_pulses)[:, np.newaxis]
+        pulse_starts = (timeline.delay_starts[selected] + begin + index * spacing
+                        + np.cumsum(pulses, axis=0) - pulses)
+        pulse_qubits = np.repeat(timeline.delay_qubits[selected], num_pulses)
+        pulse_starts, pulses = pulse_starts.T.ravel(), pulses.T.ravel()
+        timeline.remove_delays(selected)
+        timeline.add_intervals(pulse_qubits, pulse_starts, pulse_starts + pulses,
+                               self._pulse_nodes(dag, pulse_qubits, pulse_ops))
+        schedule = self.property_set['schedule_array']
+        if schedule is not None:
+            self.property_set['schedule_array'] = append_records(
+                schedule, timeline.programs[pulse_qubits], [op.name for op in pulse_ops],
+                pulse_qubits, pulse_starts, pulses
+            )
+        return dag
+
+    @staticmethod
+    def _pulse_nodes(dag, qubits, pulse_ops):
+        """DAG nodes of ``pulse_ops``, found on the wires of ``qubits``."""
+        position = {id(op): i for i, op in enumerate(pulse_ops)}
+        nodes = [None] * len(pulse_ops)
+        for qubit in np.unique(qubits).tolist():
+            for node in dag.nodes_on_wire(dag.qubits[qubit], only_ops=True):
+                i = position.get(id(node.op))
+                if i is not None:
+                    nodes[i] = node
+        return nodes
+
+    def _sequence_dag(self, pulse_durations, gaps, unit):
+        """One-qubit DAG of the sequence with the delays ``gaps = (begin, spacing, end)``."""
+        begin, spacing, end = gaps
+        qreg = QuantumRegister(1)
+        sequence_dag = DAGCircuit()
+        sequence_dag.add_qreg(qreg)
+        idles = [begin] + [spacing] * (len(pulse_durations) - 1)
+        for gate, duration, idle in zip(self.dd_sequence, pulse_durations, idles):
+            if idle > 0:
+                sequence_dag.apply_operation_back(Delay(idle, unit), [qreg[0]], [])
+            pulse = gate.copy()
+            pulse.duration = duration
+            pulse.unit = unit
+            sequence_dag.apply_operation_back(pulse, [qreg[0]], [])
+        if end > 0:
+            sequence_dag.apply_operation_back(Delay(end, unit), [qreg[0]], [])
+        return sequence_dag
@@ -0,0 +1,12 @@
+"""ASAP Scheduling."""
+from .base_multi_schedule import BaseMultiSchedule
+
+
+class MultiASAPSchedule(BaseMultiSchedule):
+    """ASAP Scheduling.
+
+    Times are computed in a single forward pass over the topological order,
+    from the start of the circuit (see ``BaseMultiSchedule``).
+    """
+
+    reverse = False
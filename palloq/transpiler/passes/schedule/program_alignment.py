@@ -0,0 +1,134 @@
+"""Alignment of the programs of a composed circuit in time."""
+import numpy as np
+from qiskit.circuit import Barrier
+from qiskit.dagcircuit import DAGNode
+from qiskit.transpiler.exceptions import TranspilerError
+
+ALIGNMENTS = ('start', 'end', 'center')
+
+# name of the register added by FullAncillaAllocation
+_ANCILLA_NAME = 'ancilla'
+
+
+def qubit_programs(dag, layout=None):
+    """Program id of every qubit of ``dag``.
+
+    ``_compose_multidag`` gives every program its own quantum register. Once the
+    DAG is laid out, the register of a physical qubit is read from the
+    virtual qubit that ``layout`` puts on it. Ancilla qubits and qubits
+    without a virtual qubit get a program of their own.
+
+    Args:
+        dag (DAGCircuit): composed batch of programs
+        layout (Layout): initial layout of a laid-out ``dag``, or None
+
+    Returns:
+        ndarray: program id of each qubit, in the order of ``dag.qubits``
+    """
+    physical_bits = layout.get_physical_bits() if layout is not None else None
+    program_ids = {}
+    programs = np.empty(len(dag.qubits), dtype=int)
+    for i, qubit in enumerate(dag.qubits):
+        virtual = qubit if physical_bits is None else physical_bits.get(i)
+        if virtual is None or virtual.register.name.startswith(_ANCILLA_NAME):
+            key = i
+        else:
+            key = virtual.register
+        programs[i] = program_ids.setdefault(key, len(program_ids))
+    return programs
+
+
+def merge_programs(nodes, qubit_ids, programs):
+    """Merge the programs that share a gate, e.g. a SWAP inserted by routing.
+
+    Barriers do not merge programs.
+
+    Args:
+        nodes (list[DAGNode]): op nodes
+        qubit_ids (dict): position of each qubit in ``dag.qubits``
+        programs (ndarray): program id of each qubit
+
+    Returns:
+        ndarray: program id of each qubit, merged programs sharing the smallest id
+    """
+    parent = list(range(int(programs.max(initial=-1)) + 1))
+
+    def find(program):
+        while parent[program] != program:
+            parent[program] = parent[parent[program]]
+            program = parent[program]
+        return program
+
+    for node in nodes:
+        if len(node.qargs) < 2 or isinstance(node.op, Barrier):
+            continue
+        roots = {find(programs[qubit_ids[q]]) for q in node.qargs}
+        root = min(roots)
+        for other in roots:
+            parent[other] = root
+    return np.array([find(program) for program in programs.tolist()], dtype=int)
+
+
+def split_barriers(nodes, qubit_ids, programs):
+    """Replace every barrier across programs with one barrier per program.
+
+    Args:
+        nodes (list[DAGNode]): op nodes in topological order
+        qubit_ids (dict): position of each qubit in ``dag.qubits``
+        programs (ndarray): program id of each qubit
+
+    Returns:
+        list[DAGNode]: nodes in topological order
+    """
+    split = []
+    for node in nodes:
+        groups = {}
+        for q in node.qargs:
+            groups.setdefault(programs[qubit_ids[q]], []).append(q)
+        if len(groups) < 2 or not isinstance(node.op, Barrier):
+            split.append(node)
+            continue
+        for qargs in groups.values():
+            split.append(DAGNode(type='op', op=Barrier(len(qargs)), name='barrier', qargs=qargs))
+    return split
+
+
+def alignment_offsets(node_programs, starts, stops, duration, alignment, integral=True,
+                      num_programs=None):
+    """Shift of each program that aligns it in ``[0, duration]``.
+
+    'start' moves every program to the start of the circuit, 'end' to its end
+    and 'center' centres it on the longest program.
+
+    Args:
+        node_programs (ndarray): program id of each node
+        starts (ndarray): start time of each node, from the start of the circuit
+        stops (ndarray): stop time of each node
+        duration (int or float): duration of the circuit
+        alignment (str): 'start', 'end' or 'center'
+        integral (bool): keep the shifts integer, for times in dt
+        num_programs (int): number of program ids, by default one more than the largest
+
+    Returns:
+        ndarray: shift of each program id
+
+    Raises:
+        TranspilerError: if the alignment is unknown.
+    """
+    if alignment not in ALIGNMENTS:
+        raise TranspilerError("Invalid program alignment %s." % alignment)
+    if num_programs is None:
+        num_programs = int(node_programs.max(initial=-1)) + 1
+    first = np.full(num_programs, duration, dtype=np.result_type(starts, duration))
+    last = np.zeros(num_programs, dtype=first.dtype)
+    np.minimum.at(first, node_programs, starts)
+    np.maximum.at(last, node_programs, stops)
+
+    slack = duration - (last - first)
+    if alignment == 'start':
+        target = np.zeros_like(slack)
+    elif alignment == 'end':
+        target = slack
+    else:
+        target = slack // 2 if integral else slack / 2
+    return target - first
@@ -0,0 +1,146 @@
+"""Per-qubit timeline of a scheduled circuit."""
+import numpy as np
+
+
+class QubitTimeline:
+    """Busy intervals of every qubit of a scheduled circuit.
+
+    Times are measured from the start of the circuit. The intervals of each
+    qubit are stored as sorted arrays in CSR form: the intervals of qubit
+    ``q`` are ``starts[ptr[q]:ptr[q + 1]]`` and ``stops[ptr[q]:ptr[q + 1]]``,
+    and ``node_ids`` gives the scheduled node of each interval. Intervals of a
+    qubit never overlap and are sorted by start then stop, so zero-duration
+    intervals sharing a start come first and both ``starts`` and ``stops``
+    are sorted per qubit. An overlap query is then two binary searches, and
+    the idle gaps of all qubits are extracted with array operations.
+
+    Qubits are the positions in ``dag.qubits``, i.e. physical qubits once
+    the DAG is laid out.
+
+    The delays that pad the idle gaps of the scheduled DAG can be recorded
+    as flat arrays (``delay_qubits``, ``delay_starts``, ``delay_durations``)
+    with their DAG nodes in ``delay_nodes``, and the program id of each
+    qubit in ``programs``.
+    """
+
+    def __init__(self, num_qubits, duration, qubits, node_ids, starts, stops, nodes=None,
+                 delays=None, programs=None):
+        """
+        Args:
+            num_qubits (int): number of qubits of the circuit
+            duration (int or float): duration of the circuit
+            qubits (ndarray): qubit of each (node, qubit) interval
+            node_ids (ndarray): node of each interval
+            starts (ndarray): start time of each interval
+            stops (ndarray): stop time of each interval
+            nodes (list): scheduled DAG node of each node id
+            delays (tuple): (qubits, starts, durations, nodes) of the delays of the
+                scheduled DAG
+            programs (ndarray): program id of each qubit
+        """
+        self.num_qubits = num_qubits
+        self.duration = duration
+        self._set_intervals(qubits, node_ids, starts, stops)
+        self.nodes = nodes
+        delay_qubits, delay_starts, delay_durations, delay_nodes = delays or ([], [], [], [])
+        self.delay_qubits = np.asarray(delay_qubits, dtype=int)
+        self.delay_starts = np.asarray(delay_starts)
+        self.delay_durations = np.asarray(delay_durations)
+        self.delay_nodes = list(delay_nodes)
+        self.programs = None if programs is None else np.asarray(programs, dtype=int)
+
+    def _set_intervals(self, qubits, node_ids, starts, stops):
+        """Store the intervals sorted by qubit, start and stop, with their CSR pointers."""
+        qubits = np.asarray(qubits, dtype=int)
+        starts = np.asarray(starts)
+        stops = np.asarray(stops)
+        order = np.lexsort((stops, starts, qubits))
+        self.qubits = qubits[order]
+        self.node_ids = np.asarray(node_ids, dtype=int)[order]
+        self.starts = starts[order]
+        self.stops = stops[order]
+        self.ptr = np.searchsorted(self.qubits, np.arange(self.num_qubits + 1))
+
+    def add_intervals(self, qubits, starts, stops, nodes):
+        """Record one-qubit nodes inserted into the idle gaps, e.g. decoupling pulses.
+
+        The nodes get the next node ids, in the order given.
+
+        Args:
+            qubits (ndarray): qubit of each node
+            starts (ndarray): start time of each node
+            stops (ndarray): stop time of each node
+            nodes (list): DAG node of each interval
+        """
+        if self.nodes is None:
+            self.nodes = [None] * (int(self.node_ids.max(initial=-1)) + 1)
+        node_ids = np.arange(len(self.nodes), len(self.nodes) + len(nodes))
+        self.nodes = list(self.nodes) + list(nodes)
+        self._set_intervals(
+            np.concatenate([self.qubits, np.asarray(qubits, dtype=int)]),
+            np.concatenate([self.node_ids, node_ids]),
+            np.concatenate([self.starts, starts]),
+            np.concatenate([self.stops, stops]),
+        )
+
+    def remove_delays(self, indices):
+        """Forget the delays at ``indices``, e.g. once they are replaced in the DAG."""
+        keep = np.ones(len(self.delay_nodes), dtype=bool)
+        keep[indices] = False
+        self.delay_qubits = self.delay_qubits[keep]
+        self.delay_starts = self.delay_starts[keep]
+        self.delay_durations = self.delay_durations[keep]
+        self.delay_nodes = [node for node, kept in zip(self.delay_nodes, keep.tolist()) if kept]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def intervals(self, qubit):
+        """``(starts, stops, node ids)`` of the intervals of ``qubit``, in time order."""
+        window = slice(self.ptr[qubit], self.ptr[qubit + 1])
+        return self.starts[window], self.stops[window], self.node_ids[window]
+
+    def overlapping(self, qubit, start, stop):
+        """Node ids running on ``qubit`` at some time in ``[start, stop)``, in time order."""
+        starts, stops, node_ids = self.intervals(qubit)
+        first = np.searchsorted(stops, start, side='right')
+        last = np.searchsorted(starts, stop, side='left')
+        return node_ids[first:max(first, last)]
+
+    def busy_time(self):
+        """Total busy time of each qubit."""
+        return np.bincount(self.qubits, weights=self.stops - self.starts,
+                           minlength=self.num_qubits)
+
+    def idle_time(self):
+        """Total idle time of each qubit up to the end of the circuit."""
+        return self.duration - self.busy_time()
+
+    def idle_gaps(self, min_duration=0):
+        """Idle gaps longer than ``min_duration`` on all qubits.
+
+        A gap runs from the end of a node, or the start of the circuit, to the
+        start of the next node on the qubit, or the end of the circuit.
+
+        Returns:
+            tuple: (qubits, starts, stops) arrays of the gaps, sorted by qubit
+            then start
+        """
+        # gap before each interval, from the previous stop on the same qubit
+        previous = np.empty_like(self.stops)
+        previous[1:] = self.stops[:-1]
+        first = self.ptr[:-1][self.ptr[:-1] < self.ptr[1:]]
+        previous[first] = 0
+
+        # gap after the last interval of each qubit, or the whole circuit
+        last_stops = np.zeros(self.num_qubits, dtype=self.stops.dtype)
+        nonempty = self.ptr[1:] > self.ptr[:-1]
+        last_stops[nonempty] = self.stops[self.ptr[1:][nonempty] - 1]
+
+        qubits = np.concatenate([self.qubits, np.arange(self.num_qubits)])
+        starts = np.concatenate([previous, last_stops])
+        stops = np.concatenate([self.starts, np.full(self.num_qubits, self.duration)])
+        keep = stops - starts > min_duration
+        qubits, starts, stops = qubits[keep], starts[keep], stops[keep]
+        order = np.lexsort((starts, qubits))
+        return qubits[order], starts[order], stops[order]
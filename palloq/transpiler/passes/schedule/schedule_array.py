@@ -0,0 +1,122 @@
+"""Scheduled instructions of a multi-program circuit as a NumPy structured array."""
+import numpy as np
+from qiskit.circuit import Barrier
+from qiskit.circuit.delay import Delay
+
+# qubits field entry of an instruction acting on fewer qubits than the widest one
+NO_QUBIT = -1
+
+
+def schedule_dtype(unit, num_qubits=2, kind_length=8):
+    """Record type of ``schedule_array``.
+
+    Args:
+        unit (str): time unit of the schedule: integer times for 'dt', float otherwise
+        num_qubits (int): width of the qubits field
+        kind_length (int): maximal length of an instruction name
+
+    Returns:
+        numpy.dtype: fields program, kind, qubits, start and duration
+    """
+    time = np.int64 if unit == 'dt' else np.float64
+    return np.dtype([
+        ('program', np.int32),
+        ('kind', 'U%d' % kind_length),
+        ('qubits', np.int32, (num_qubits,)),
+        ('start', time),
+        ('duration', time),
+    ])
+
+
+def schedule_array(nodes, qubit_ids, programs, starts, durations, unit):
+    """Structured array of the scheduled instructions of ``nodes``.
+
+    There is one record per instruction, in the order of ``nodes``, with its
+    program id, name, physical qubits (padded with ``NO_QUBIT``), start time
+    from the start of the circuit and duration. Delays and barriers only
+    pad the schedule and are left out.
+
+    The array has no object fields, so it is saved with ``numpy.save`` and
+    analysed with array operations, e.g. ``program_makespans``.
+
+    Args:
+        nodes (list[DAGNode]): scheduled op nodes
+        qubit_ids (dict): position of each qubit in ``dag.qubits``
+        programs (ndarray): program id of each qubit
+        starts (list): start time of each node, from the start of the circuit
+        durations (list): duration of each node
+        unit (str): time unit of the schedule
+
+    Returns:
+        ndarray: the records, with dtype ``schedule_dtype``
+    """
+    kept = [i for i, node in enumerate(nodes) if not isinstance(node.op, (Delay, Barrier))]
+    num_qubits = max((len(nodes[i].qargs) for i in kept), default=1)
+    kind_length = max((len(nodes[i].name) for i in kept), default=1)
+    schedule = np.zeros(len(kept), dtype=schedule_dtype(unit, num_qubits, kind_length))
+    if not kept:
+        return schedule
+
+    qubits = np.full((len(kept), num_qubits), NO_QUBIT, dtype=np.int32)
+    for row, i in enumerate(kept):
+        qargs = [qubit_ids[q] for q in nodes[i].qargs]
+        qubits[row, :len(qargs)] = qargs
+    schedule['qubits'] = qubits
+    schedule['program'] = programs[qubits[:, 0]]
+    schedule['kind'] = [nodes[i].name for i in kept]
+    schedule['start'] = np.asarray(starts)[kept]
+    schedule['duration'] = np.asarray(durations)[kept]
+    return schedule
+
+
+def append_records(schedule, programs, kinds, qubits, starts, durations):
+    """``schedule`` with records of one-qubit instructions appended.
+
+    Used by passes that insert instructions into a scheduled DAG, e.g.
+    decoupling pulses. The fields are widened as needed for the new names.
+
+    Args:
+        schedule (ndarray): output of ``schedule_array``
+        programs (ndarray): program id of each new instruction
+        kinds (list[str]): name of each new instruction
+        qubits (ndarray): physical qubit of each new instruction
+        starts (ndarray): start time of each new instruction
+        durations (ndarray): duration of each new instruction
+
+    Returns:
+        ndarray: the records of ``schedule`` followed by the new ones
+    """
+    num_qubits = schedule.dtype['qubits'].shape[0]
+    kind_length = max([schedule.dtype['kind'].itemsize // 4] + [len(kind) for kind in kinds])
+    unit = 'dt' if schedule.dtype['start'] == np.int64 else 's'
+    dtype = schedule_dtype(unit, num_qubits, kind_length)
+    records = np.zeros(len(kinds), dtype=dtype)
+    records['program'] = programs
+    records['kind'] = kinds
+    records['qubits'] = NO_QUBIT
+    records['qubits'][:, 0] = qubits
+    records['start'] = starts
+    records['duration'] = durations
+    return np.concatenate([schedule.astype(dtype), records])
+
+
+def program_makespans(schedule, num_programs=None):
+    """First start and last stop of every program of ``schedule``.
+
+    Args:
+        schedule (ndarray): output of ``schedule_array``
+        num_programs (int): number of program ids, by default one more than the largest
+
+    Returns:
+        tuple: (starts, stops) arrays indexed by program id, zero for a program
+        without instructions
+    """
+    programs = schedule['program']
+    if num_programs is None:
+        num_programs = int(programs.max(initial=-1)) + 1
+    time = schedule.dtype['start']
+    stops = np.zeros(num_programs, dtype=time)
+    np.maximum.at(stops, programs, schedule['start'] + schedule['duration'])
+    starts = stops.copy()
+    np.minimum.at(starts, programs, schedule['start'])
+    return starts, stops
@@ -44,13 +44,22 @@ from qiskit.transpiler.passes import TimeUnitAnalysis
 from qiskit.transpiler import TranspilerError
 
 from palloq.transpiler.passes import CrosstalkAdaptiveMultiLayout
+from palloq.transpiler.passes import RegionPartitionedMultiLayout
+from palloq.transpiler.passes import AnnealingLayoutRefinement
 from palloq.transpiler.passes import MultiALAPSchedule
+from palloq.transpiler.passes import MultiASAPSchedule
+from palloq.transpiler.passes import MultiDynamicalDecoupling
+from palloq.transpiler.crosstalk_model import CrosstalkModel
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def multi_pass_manager(pass_manager_config: PassManagerConfig, crosstalk_prop=None) -> PassManager:
+def multi_pass_manager(pass_manager_config: PassManagerConfig, crosstalk_prop=None,
+                       layout_starts=1, layout_time_budget=None,
+                       layout_vf2_max_qubits=0, layout_iterations=10000,
+                       schedule_alignment=None, dd_sequence=None,
+                       dd_min_duration=0) -> PassManager:
     basis_gates = pass_manager_config.basis_gates
     coupling_map = pass_manager_config.coupling_map
     initial_layout = pass_manager_config.initial_layout
@@ -61,6 +70,7 @@ def multi_pass_manager(pass_manager_config: PassManagerConfig, crosstalk_prop=No
     instruction_durations = pass_manager_config.instruction_durations
     seed_transpiler = pass_manager_config.seed_transpiler
     backend_properties = pass_manager_config.backend_properties
+    crosstalk_model = CrosstalkModel.from_prop(crosstalk_prop)
 
     # 1. Unroll to 1q or 2q gates
     _unroll3q = Unroll3qOrMore()
@@ -81,7 +91,22 @@ def multi_pass_manager(pass_manager_config: PassManagerConfig, crosstalk_prop=No
     elif layout_method == 'sabre':
         _choose_layout_2 = SabreLayout(coupling_map, max_iterations=4, seed=seed_transpiler)
     elif layout_method == 'xtalk_adaptive':
-        _choose_layout_2 = CrosstalkAdaptiveMultiLayout(backend_properties, crosstalk_prop=crosstalk_prop)
+        _choose_layout_2 = CrosstalkAdaptiveMultiLayout(backend_properties, crosstalk_prop=crosstalk_model,
+                                                        num_starts=layout_starts,
+                                                        time_budget=layout_time_budget,
+                                                        seed=seed_transpiler,
+                                                        vf2_max_qubits=layout_vf2_max_qubits)
+    elif layout_method == 'xtalk_region':
+        _choose_layout_2 = RegionPartitionedMultiLayout(backend_properties, crosstalk_prop=crosstalk_model,
+                                                        vf2_max_qubits=layout_vf2_max_qubits)
+    elif layout_method == 'xtalk_annealing':
+        _xtalk_layout = CrosstalkAdaptiveMultiLayout(backend_properties, crosstalk_prop=crosstalk_model,
+                                                     vf2_max_qubits=layout_vf2_max_qubits)
+        _choose_layout_2 = [_xtalk_layout,
+                            AnnealingLayoutRefinement(backend_properties, context=_xtalk_layout.context,
+                                                      max_iterations=layout_iterations,
+                                                      time_budget=layout_time_budget,
+                                                      seed=seed_transpiler)]
     # elif layout_method == 'xtalk_sabre':
     #     _choose_layout_2 = CrosstalkSabreLayout(coupling_map, max_iterations=4, seed=seed_transpiler, crosstalk_prop=crosstalk_prop)
     else:
@@ -166,13 +191,22 @@ def multi_pass_manager(pass_manager_config: PassManagerConfig, crosstalk_prop=No
     if scheduling_method:
         _scheduling = [TimeUnitAnalysis(instruction_durations)]
         if scheduling_method in {'alap', 'as_late_as_possible'}:
-            _scheduling += [MultiALAPSchedule(instruction_durations)]
+            _scheduling += [MultiALAPSchedule(instruction_durations, alignment=schedule_alignment)]
         elif scheduling_method in {'asap', 'as_soon_as_possible'}:
-            # _scheduling += [ASAPSchedule(instruction_durations)]
-            """FIXME"""
-            raise TranspilerError("Sorry now this method is not available: %s." % scheduling_method)
+            _scheduling += [MultiASAPSchedule(instruction_durations, alignment=schedule_alignment)]
+        elif scheduling_method == 'xtalk_alap':
+            _scheduling += [MultiALAPSchedule(instruction_durations, crosstalk_prop=crosstalk_model,
+                                              backend_prop=backend_properties,
+                                              alignment=schedule_alignment)]
+        elif scheduling_method == 'xtalk_asap':
+            _scheduling += [MultiASAPSchedule(instruction_durations, crosstalk_prop=crosstalk_model,
+                                              backend_prop=backend_properties,
+                                              alignment=schedule_alignment)]
         else:
             raise TranspilerError("Invalid scheduling method %s." % scheduling_method)
+        if dd_sequence:
+            _scheduling += [MultiDynamicalDecoupling(instruction_durations, dd_sequence,
+                                                     min_duration=dd_min_duration)]
 
     # Build pass manager
     multi_pm = PassManager()
@@ -0,0 +1,29 @@
+"""
+Fixtures shared by the layout tests
+"""
+import pytest
+
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+
+
+@pytest.fixture
+def batch_dag():
+    """Return a factory of composed batches, one register per program.
+
+    ``batch_dag(sizes, names=None, repeats=None)`` gives program ``i`` a
+    register of ``sizes[i]`` qubits (named ``names[i]``, default ``qr<i>``)
+    with a CNOT chain over it, repeated ``repeats[i]`` times.
+    """
+    def make(sizes=(2, 2), names=None, repeats=None):
+        names = names or ['qr{}'.format(i) for i in range(len(sizes))]
+        repeats = repeats or [1] * len(sizes)
+        registers = [QuantumRegister(size, name) for size, name in zip(sizes, names)]
+        qc = QuantumCircuit(*registers)
+        for qr, count in zip(registers, repeats):
+            for _ in range(count):
+                for i in range(len(qr) - 1):
+                    qc.cx(qr[i], qr[i + 1])
+        return circuit_to_dag(qc)
+
+    return make
@@ -0,0 +1,41 @@
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.compiler import transpile
+from qiskit.transpiler import Layout, InstructionDurations
+from qiskit.converters import circuit_to_dag
+
+from palloq.transpiler.passes import MultiALAPSchedule, MultiASAPSchedule
+
+
+def _transpiled_dag():
+    qr0 = QuantumRegister(2)
+    qr1 = QuantumRegister(2)
+    qc = QuantumCircuit(qr0, qr1)
+
+    qc.cx(qr0[0], qr0[1])
+
+    qc.cx(qr1[0], qr1[1])
+    qc.cx(qr1[1], qr1[0])
+    qc.cx(qr1[0], qr1[1])
+
+    qc.measure_all()
+
+    layout = Layout({qr0[0]: 0, qr0[1]: 1, qr1[0]: 2, qr1[1]: 3})
+    return circuit_to_dag(transpile(qc, initial_layout=layout))
+
+
+def _timeline(dag, qubit):
+    return [(node.name, node.op.duration) for node in dag.nodes_on_wire(qubit, only_ops=True)]
+
+
+def test_multi_asap():
+    durations = InstructionDurations([('cx', None, 1000), ('measure', None, 1000)])
+    dag = _transpiled_dag()
+
+    masap_dag = MultiASAPSchedule(durations).run(dag, time_unit="dt")
+    malap_dag = MultiALAPSchedule(durations).run(dag, time_unit="dt")
+
+    assert masap_dag.duration == malap_dag.duration == 4000
+    q0 = masap_dag.qubits[0]
+    # the short program starts right away under ASAP and waits under ALAP
+    assert _timeline(masap_dag, q0)[0] == ('cx', 1000)
+    assert _timeline(malap_dag, q0)[0] == ('delay', 2000)
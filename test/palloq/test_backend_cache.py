@@ -0,0 +1,51 @@
+import numpy as np
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+
+from palloq.transpiler.passes.layout.backend_cache import BackendTableCache
+from palloq.transpiler.passes.layout.crosstalk_adaptive_layout import CrosstalkAdaptiveMultiLayout
+
+
+def _layout(fake_machine, cache):
+    qr0 = QuantumRegister(2, 'qr0')
+    qr1 = QuantumRegister(2, 'qr1')
+    qc = QuantumCircuit(qr0, qr1)
+    qc.cx(qr0[0], qr0[1])
+    qc.cx(qr0[1], qr0[0])
+    qc.cx(qr1[0], qr1[1])
+    xtalk_prop = {(0, 1): {(2, 3): 2}}
+
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, xtalk_prop, table_cache=cache)
+    pass_.run(circuit_to_dag(qc))
+    layout = pass_.property_set['layout']
+    return [layout[q] for q in qr0[:] + qr1[:]]
+
+
+def test_second_run_hits_cache(fake_machine):
+    cache = BackendTableCache()
+    first = _layout(fake_machine, cache)
+    second = _layout(fake_machine, cache)
+
+    assert first == second == [0, 1, 3, 4]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_store(fake_machine, tmp_path):
+    first = _layout(fake_machine, BackendTableCache(cache_dir=str(tmp_path)))
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    cache = BackendTableCache(cache_dir=str(tmp_path))
+    assert _layout(fake_machine, cache) == first
+    assert cache.hits == 1
+
+
+def test_lru_eviction():
+    cache = BackendTableCache(maxsize=2)
+    for key in "abc":
+        cache.put(key, {"x": np.zeros(2)})
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+    # returned tables are copies
+    cache.get("c")["x"][0] = 1
+    assert cache.get("c")["x"][0] == 0
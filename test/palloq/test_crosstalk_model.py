@@ -0,0 +1,31 @@
+import pytest
+
+from palloq.transpiler import CrosstalkModel
+
+
+def test_keys_are_sorted_and_ratios_symmetric():
+    model = CrosstalkModel({(1, 0): {(3, 2): 2}, (2, 3): {(0, 1): 3, (4, 5): 1.5}})
+
+    assert model.is_source((0, 1)) and model.is_source((3, 2))
+    assert not model.is_source((4, 5))
+    assert model.ratio((0, 1), (2, 3)) == 2
+
+    edges, ratios = model.affected_edges((0, 1))
+    assert edges == [(2, 3)]
+    assert ratios.tolist() == [3]
+
+    edges, ratios = model.affecting_edges((2, 3))
+    assert edges == [(0, 1)]
+    assert ratios.tolist() == [3]
+
+    edges, ratios = model.affecting_edges((5, 4))
+    assert edges == [(2, 3)]
+    assert ratios.tolist() == [1.5]
+
+
+def test_model_is_reused_and_read_only():
+    model = CrosstalkModel({(0, 1): {(2, 3): 2}})
+    assert CrosstalkModel.from_prop(model) is model
+    assert not CrosstalkModel.from_prop(None)
+    with pytest.raises(ValueError):
+        model.affects_ratio[0] = 5
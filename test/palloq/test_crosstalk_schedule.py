@@ -0,0 +1,45 @@
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+from qiskit.transpiler import InstructionDurations
+
+from palloq.transpiler.passes import MultiALAPSchedule, MultiASAPSchedule
+from palloq.transpiler.passes.schedule.crosstalk_serialization import EdgeIntervalIndex
+
+
+def _parallel_cx_dag():
+    qr = QuantumRegister(6, 'q')
+    qc = QuantumCircuit(qr)
+    qc.cx(qr[0], qr[1])
+    qc.cx(qr[2], qr[3])
+    return circuit_to_dag(qc)
+
+
+def _durations():
+    return InstructionDurations([('cx', None, 1000)], dt=1e-9)
+
+
+def test_edge_interval_index():
+    index = EdgeIntervalIndex()
+    index.add(0, 100, 200)
+    index.add(0, 0, 50)
+    index.add(0, 300, 400)
+
+    assert index.overlapping(0, 50, 100) == []
+    assert index.overlapping(0, 150, 350) == [(100, 200), (300, 400)]
+    assert index.overlapping(1, 0, 1000) == []
+
+
+def test_serialize_strong_crosstalk(fake_machine):
+    # the fidelity gain of a factor 3 outweighs 1us of decoherence (T1 = T2 = 50us)
+    xtalk_prop = {(0, 1): {(2, 3): 3}}
+    for scheduler in (MultiASAPSchedule, MultiALAPSchedule):
+        dag = scheduler(_durations(), crosstalk_prop=xtalk_prop,
+                        backend_prop=fake_machine).run(_parallel_cx_dag(), time_unit='dt')
+        assert dag.duration == 2000
+
+
+def test_keep_weak_crosstalk_parallel(fake_machine):
+    xtalk_prop = {(0, 1): {(2, 3): 1.1}}
+    dag = MultiASAPSchedule(_durations(), crosstalk_prop=xtalk_prop,
+                            backend_prop=fake_machine).run(_parallel_cx_dag(), time_unit='dt')
+    assert dag.duration == 1000
@@ -0,0 +1,60 @@
+import pytest
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.circuit.delay import Delay
+from qiskit.converters import circuit_to_dag
+from qiskit.transpiler import InstructionDurations
+from qiskit.transpiler.exceptions import TranspilerError
+
+from palloq.transpiler.passes.schedule.duration_table import DurationTable, DurationTableCache
+
+
+def _nodes():
+    qr = QuantumRegister(3, 'q')
+    qc = QuantumCircuit(qr)
+    qc.cx(qr[0], qr[1])
+    qc.cx(qr[1], qr[2])
+    qc.x(qr[2])
+    qc.barrier()
+    qc.append(Delay(100, 'dt'), [qr[0]])
+    qc.measure_all()
+    return list(circuit_to_dag(qc).topological_op_nodes())
+
+
+def _durations():
+    return InstructionDurations(
+        [('cx', None, 800), ('cx', [1, 2], 1200), ('x', None, 160), ('measure', None, 2.0, 'us')],
+        dt=2e-9,
+    )
+
+
+@pytest.mark.parametrize('unit', ['dt', 's'])
+def test_lookup_matches_instruction_durations(unit):
+    durations = _durations()
+    nodes = _nodes()
+
+    expected = [durations.get(node.op, node.qargs, unit=unit) for node in nodes]
+    looked_up = DurationTable(durations, unit).lookup(nodes)
+    assert looked_up == expected
+    assert [type(d) for d in looked_up] == [type(d) for d in expected]
+
+
+def test_gate_durations_keep_the_table_type():
+    table = DurationTable(_durations(), 'dt')
+
+    assert table.gate_durations('x', [0, 1]).dtype.kind == 'i'
+    assert table.gate_durations('y', [0, 1]).tolist() == [float('inf')] * 2
+
+
+def test_missing_duration_raises():
+    table = DurationTable(InstructionDurations([('cx', None, 800)]), 'dt')
+    with pytest.raises(TranspilerError):
+        table.lookup(_nodes())
+
+
+def test_cache_reuses_tables():
+    cache = DurationTableCache()
+    first = cache.table(_durations(), 'dt')
+
+    assert cache.table(_durations(), 'dt') is first
+    assert cache.table(_durations(), 's') is not first
+    assert (cache.hits, cache.misses) == (1, 2)
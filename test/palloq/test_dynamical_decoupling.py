@@ -0,0 +1,115 @@
+import math
+
+import pytest
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+from qiskit.transpiler import InstructionDurations, PassManager
+from qiskit.transpiler.exceptions import TranspilerError
+from qiskit.test.mock import FakeToronto
+from qiskit.transpiler.passes import TimeUnitAnalysis
+
+from palloq.compiler.multi_transpile import multi_transpile
+from palloq.transpiler.passes import MultiALAPSchedule, MultiDynamicalDecoupling
+
+
+def _circuit():
+    qr = QuantumRegister(3, 'q')
+    qc = QuantumCircuit(qr)
+    qc.u3(math.pi, 0, math.pi, qr[2])
+    for _ in range(3):
+        qc.cx(qr[0], qr[1])
+    qc.cx(qr[1], qr[2])
+    return qc
+
+
+def _durations():
+    return InstructionDurations([('cx', None, 1000), ('u3', None, 50)])
+
+
+def _wire(dag, index):
+    return [(node.name, node.op.duration) for node in dag.nodes_on_wire(dag.qubits[index],
+                                                                       only_ops=True)]
+
+
+def _angles(dag, index):
+    return [tuple(round(float(p), 6) for p in node.op.params)
+            for node in dag.nodes_on_wire(dag.qubits[index], only_ops=True)
+            if node.name == 'u3']
+
+
+def _decouple(**kwargs):
+    durations = _durations()
+    pass_manager = PassManager([TimeUnitAnalysis(durations), MultiALAPSchedule(durations),
+                                MultiDynamicalDecoupling(durations, **kwargs)])
+    return circuit_to_dag(pass_manager.run(_circuit()))
+
+
+def test_xy4_fills_idle_gap():
+    dag = _decouple(dd_sequence='XY4')
+
+    # qubit 0 idles for the last 1000dt, qubit 2 before its first gate
+    assert _wire(dag, 0)[3:] == [('delay', 100), ('u3', 50), ('delay', 200), ('u3', 50),
+                                 ('delay', 200), ('u3', 50), ('delay', 200), ('u3', 50),
+                                 ('delay', 100)]
+    x, y = (round(math.pi, 6), 0.0, round(math.pi, 6)), (round(math.pi, 6),) + (
+        round(math.pi / 2, 6),) * 2
+    assert _angles(dag, 0) == [x, y, x, y]
+    assert _wire(dag, 2)[0] == ('delay', 2950)
+
+
+def test_pulses_are_recorded():
+    durations = _durations()
+    schedule_pass = MultiALAPSchedule(durations)
+    dag = schedule_pass.run(circuit_to_dag(_circuit()), time_unit='dt')
+    dd_pass = MultiDynamicalDecoupling(durations, 'XY4')
+    dd_pass.property_set = schedule_pass.property_set
+    dd_pass.run(dag)
+
+    timeline = dd_pass.property_set['qubit_timeline']
+    starts, stops, node_ids = timeline.intervals(0)
+    assert starts.tolist() == [0, 1000, 2000, 3100, 3350, 3600, 3850]
+    assert (stops - starts).tolist() == [1000] * 3 + [50] * 4
+    assert [timeline.nodes[i].name for i in node_ids.tolist()] == ['cx'] * 3 + ['u3'] * 4
+    assert len(timeline.delay_nodes) == 1
+
+    schedule = dd_pass.property_set['schedule_array']
+    pulses = schedule[(schedule['kind'] == 'u3') & (schedule['qubits'][:, 0] == 0)]
+    assert pulses['start'].tolist() == [3100, 3350, 3600, 3850]
+    assert (pulses['duration'] == 50).all() and (pulses['program'] == 0).all()
+
+
+def test_short_gaps_keep_delays():
+    dag = _decouple(dd_sequence='XX', min_duration=1000)
+
+    assert _wire(dag, 0)[3:] == [('delay', 1000)]
+
+
+def test_gaps_without_pulse_durations_keep_delays():
+    durations = InstructionDurations([('cx', None, 1000), ('u3', [1], 50), ('u3', [2], 50)])
+    pass_manager = PassManager([TimeUnitAnalysis(durations), MultiALAPSchedule(durations),
+                                MultiDynamicalDecoupling(durations, 'XX')])
+    dag = circuit_to_dag(pass_manager.run(_circuit()))
+
+    # u3 has no duration on qubit 0
+    assert _wire(dag, 0)[3:] == [('delay', 1000)]
+
+
+def test_multi_transpile_on_fake_backend():
+    backend = FakeToronto()
+    basis_gates = backend.configuration().basis_gates
+    durations = InstructionDurations.from_backend(backend)
+    circuits = [_circuit(), _circuit()]
+    options = dict(backend=backend, basis_gates=basis_gates, instruction_durations=durations,
+                   scheduling_method='alap', seed_transpiler=1)
+
+    plain = multi_transpile(circuits, **options)
+    decoupled = multi_transpile(circuits, dd_sequence='XY4', **options)
+
+    assert set(decoupled.count_ops()) <= set(basis_gates) | {'delay', 'barrier', 'measure'}
+    assert decoupled.count_ops()['u3'] > plain.count_ops().get('u3', 0)
+    assert decoupled.duration == plain.duration
+
+
+def test_needs_schedule():
+    with pytest.raises(TranspilerError):
+        MultiDynamicalDecoupling(_durations()).run(circuit_to_dag(_circuit()))
@@ -0,0 +1,42 @@
+import math
+
+import numpy as np
+
+from palloq.transpiler.passes.layout.esp_scorer import ESPScorer, program_arrays
+from palloq.transpiler.passes.layout.program_graph import ProgramGraph
+
+
+def _programs():
+    prog0 = ProgramGraph(np.array([[0, 1]]), np.array([2]))
+    prog1 = ProgramGraph(np.array([[2, 3]]), np.array([1]))
+    return program_arrays([prog0, prog1])
+
+
+def test_esp_without_crosstalk(fake_machine):
+    scorer = ESPScorer.from_backend(fake_machine)
+    program_log, batch_log = scorer.log_esp({0: 0, 1: 1, 2: 3, 3: 4}, _programs())
+
+    # cx error 0.05 and readout error 0.01 on every qubit of the fake machine
+    expected = [2 * math.log(0.95) + 2 * math.log(0.99), math.log(0.95) + 2 * math.log(0.99)]
+    assert np.allclose(program_log, expected)
+    assert math.isclose(batch_log, sum(expected))
+
+
+def test_esp_with_crosstalk(fake_machine):
+    scorer = ESPScorer.from_backend(fake_machine, {(0, 1): {(2, 3): 2}})
+    programs = _programs()
+
+    near, _ = scorer.log_esp({0: 0, 1: 1, 2: 2, 3: 3}, programs)
+    far, _ = scorer.log_esp({0: 0, 1: 1, 2: 3, 3: 4}, programs)
+
+    assert math.isclose(near[0], far[0])
+    assert math.isclose(near[1], math.log(0.9) + 2 * math.log(0.99))
+    assert far[1] > near[1]
+
+
+def test_swap_distance_lowers_esp(fake_machine):
+    scorer = ESPScorer.from_backend(fake_machine)
+    programs = _programs()
+    adjacent, _ = scorer.log_esp({0: 0, 1: 1, 2: 3, 3: 4}, programs)
+    distant, _ = scorer.log_esp({0: 0, 1: 2, 2: 3, 3: 5}, programs)
+    assert (distant < adjacent).all()
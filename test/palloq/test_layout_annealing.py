@@ -0,0 +1,36 @@
+import numpy as np
+from qiskit.transpiler.layout import Layout
+
+from palloq.transpiler.passes.layout.esp_scorer import ESPScorer, program_arrays
+from palloq.transpiler.passes.layout.layout_annealing import (
+    AnnealingLayoutRefinement,
+    IncrementalESP,
+)
+from palloq.transpiler.passes.layout.program_graph import program_graphs
+
+
+def test_incremental_matches_full_score(batch_dag, fake_machine):
+    xtalk_prop = {(0, 1): {(2, 3): 2}, (3, 4): {(1, 2): 3}}
+    scorer = ESPScorer.from_backend(fake_machine, xtalk_prop)
+    # one hardware qubit stays free, so swaps also move qubits onto it
+    programs = program_arrays(program_graphs(batch_dag((3, 2), repeats=(1, 2))))
+    esp = IncrementalESP(scorer, programs, [0, 1, 2, 3, 4], 6)
+
+    rng = np.random.default_rng(5)
+    for _ in range(50):
+        h1, h2 = rng.choice(6, size=2, replace=False)
+        esp.swap(h1, h2)
+        assert np.isclose(esp.total, scorer.log_esp(esp.hw_of, programs)[1])
+
+
+def test_refinement_removes_swaps(batch_dag, fake_machine):
+    dag = batch_dag((3, 2))
+    pass_ = AnnealingLayoutRefinement(fake_machine, max_iterations=500, seed=7)
+    pass_.property_set['layout'] = Layout(dict(zip(dag.qubits, [0, 2, 4, 1, 5])))
+    pass_.run(dag)
+
+    layout = pass_.property_set['layout']
+    physical = [layout[q] for q in dag.qubits]
+    assert abs(physical[0] - physical[1]) == 1
+    assert abs(physical[1] - physical[2]) == 1
+    assert abs(physical[3] - physical[4]) == 1
@@ -0,0 +1,74 @@
+from palloq.transpiler.passes.layout.crosstalk_adaptive_layout import (
+    CrosstalkAdaptiveContext,
+    CrosstalkAdaptiveMultiLayout,
+)
+from palloq.transpiler.passes.layout.layout_cache import LayoutCache
+
+
+def test_same_structure_hits(batch_dag, fake_machine):
+    xtalk_prop = {(0, 1): {(2, 3): 2}}
+    cache = LayoutCache()
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, xtalk_prop, layout_cache=cache)
+
+    pass_.run(batch_dag((3, 2)))
+    second = batch_dag((3, 2), names=('a', 'b'))
+    pass_.run(second)
+    layout = pass_.property_set['layout']
+    pass_.run(batch_dag((2, 2)))
+
+    assert [layout[q] for q in second.qubits] == [0, 1, 2, 3, 4]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_multi_start_hit_restores_crosstalk(batch_dag, fake_machine):
+    # multi-start moves qr0 off the greedy 0-2, so the hit must restore its state
+    xtalk_prop = {(0, 1): {(2, 3): 2}, (3, 4): {(1, 2): 3}}
+    cache = LayoutCache()
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, xtalk_prop, layout_cache=cache,
+                                         num_starts=4, seed=0, max_workers=1)
+
+    fresh = pass_.place(batch_dag((3, 2)))
+    restored = pass_.place(batch_dag((3, 2), names=('a', 'b')))
+
+    assert cache.hits == 1
+    assert restored.prog2hw == fresh.prog2hw != {q: q for q in range(5)}
+    assert restored.crosstalk_edges == fresh.crosstalk_edges != []
+    assert (restored.cx_reliabs == fresh.cx_reliabs).all()
+
+
+def test_calibration_is_part_of_the_key(batch_dag, fake_machine):
+    cache = LayoutCache()
+    dag = batch_dag()
+    CrosstalkAdaptiveMultiLayout(fake_machine, {(0, 1): {(2, 3): 2}}, layout_cache=cache).run(dag)
+    CrosstalkAdaptiveMultiLayout(fake_machine, {(0, 1): {(2, 3): 3}}, layout_cache=cache).run(dag)
+
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_context_without_key_is_not_cached(batch_dag, fake_machine):
+    cache = LayoutCache()
+    built = CrosstalkAdaptiveContext.from_backend(fake_machine, {(0, 1): {(2, 3): 2}})
+    context = CrosstalkAdaptiveContext(built.backend_prop, built.crosstalk_model, built.tables)
+    CrosstalkAdaptiveMultiLayout(None, context=context, layout_cache=cache).run(
+        batch_dag()
+    )
+
+    assert len(cache) == 0 and cache.misses == 0
+
+
+def test_unseeded_multi_start_is_not_cached(batch_dag, fake_machine):
+    cache = LayoutCache()
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, {(0, 1): {(2, 3): 2}}, num_starts=3,
+                                         max_workers=1, layout_cache=cache)
+    pass_.run(batch_dag())
+
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    cache = LayoutCache(maxsize=2)
+    for key in "abc":
+        cache.put(key, (((0, 1),), (), ()))
+    assert cache.get("a") is None
+    assert cache.get("c") == (((0, 1),), (), ())
+    assert len(cache) == 2
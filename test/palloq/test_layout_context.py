@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from palloq.transpiler.passes.layout.crosstalk_adaptive_layout import (
+    CrosstalkAdaptiveContext,
+    CrosstalkAdaptiveMultiLayout,
+)
+
+
+def _physical(layout, dag):
+    return [layout[q] for q in dag.qubits]
+
+
+def test_run_twice_on_one_instance(batch_dag, fake_machine):
+    xtalk_prop = {(0, 1): {(2, 3): 2}}
+    dag = batch_dag()
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, xtalk_prop)
+
+    pass_.run(dag)
+    first = _physical(pass_.property_set['layout'], dag)
+    pass_.run(dag)
+
+    assert _physical(pass_.property_set['layout'], dag) == first == [0, 1, 3, 4]
+
+
+def test_concurrent_place(batch_dag, fake_machine):
+    xtalk_prop = {(0, 1): {(2, 3): 2}, (3, 4): {(1, 2): 3}}
+    dags = [batch_dag((size, 2)) for size in range(2, 5)] * 3
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, xtalk_prop)
+    expected = [_physical(pass_.place(dag).to_layout(dag), dag) for dag in dags]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        states = list(executor.map(pass_.place, dags))
+
+    assert [_physical(s.to_layout(d), d) for s, d in zip(states, dags)] == expected
+
+
+def test_shared_context_is_read_only(batch_dag, fake_machine):
+    context = CrosstalkAdaptiveContext.from_backend(fake_machine, {(0, 1): {(2, 3): 2}})
+    before = context.tables["cx_reliabs"].copy()
+    pass_ = CrosstalkAdaptiveMultiLayout(None, context=context)
+    pass_.place(batch_dag())
+
+    assert not context.tables["cx_reliabs"].flags.writeable
+    assert (context.tables["cx_reliabs"] == before).all()
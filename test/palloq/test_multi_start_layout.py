@@ -0,0 +1,85 @@
+import multiprocessing
+import time
+
+from palloq.transpiler.passes.layout.crosstalk_adaptive_layout import (
+    CrosstalkAdaptiveMultiLayout,
+    CrosstalkAdaptiveState,
+)
+from palloq.transpiler.passes.layout.esp_scorer import ESPScorer
+from palloq.transpiler.passes.layout.layout_cache import LayoutCache
+
+
+def _score(dag, fake_machine, xtalk_prop, **kwargs):
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, xtalk_prop, **kwargs)
+    state = pass_.place(dag)
+    pass_.close()
+    scorer = ESPScorer.from_backend(fake_machine, xtalk_prop)
+    _, batch_esp = scorer.score(state.to_layout(dag), state.prog_graphs, dag.qubits)
+    return state, batch_esp
+
+
+def test_multi_start_beats_greedy(batch_dag, fake_machine):
+    # greedy packs qr0 onto 0-2, where both crosstalk pairs hit it
+    dag = batch_dag((3, 2))
+    xtalk_prop = {(0, 1): {(2, 3): 2}, (3, 4): {(1, 2): 3}}
+    _, greedy_esp = _score(dag, fake_machine, xtalk_prop)
+    state, esp = _score(dag, fake_machine, xtalk_prop, num_starts=6, seed=11, max_workers=1)
+
+    assert esp > greedy_esp
+    assert len(set(state.prog2hw.values())) == 5
+
+
+def test_multi_start_process_pool(batch_dag, fake_machine):
+    dag = batch_dag((3, 2))
+    xtalk_prop = {(0, 1): {(2, 3): 2}}
+    serial, serial_esp = _score(dag, fake_machine, xtalk_prop, num_starts=4, seed=3, max_workers=1,
+                                layout_cache=LayoutCache())
+    pooled, pooled_esp = _score(dag, fake_machine, xtalk_prop, num_starts=4, seed=3, max_workers=2,
+                                layout_cache=LayoutCache())
+
+    assert pooled_esp == serial_esp
+    assert pooled.prog2hw == serial.prog2hw
+
+
+def test_zero_budget_keeps_greedy_layout(batch_dag, fake_machine):
+    dag = batch_dag((3, 2))
+    xtalk_prop = {(0, 1): {(2, 3): 2}}
+    greedy, _ = _score(dag, fake_machine, xtalk_prop)
+    budgeted, _ = _score(dag, fake_machine, xtalk_prop, num_starts=8, time_budget=0, max_workers=1)
+
+    assert budgeted.prog2hw == greedy.prog2hw
+
+
+def test_multi_start_state_matches_its_layout(batch_dag, fake_machine):
+    dag = batch_dag((3, 2))
+    xtalk_prop = {(0, 1): {(2, 3): 2}}
+    greedy, _ = _score(dag, fake_machine, xtalk_prop)
+    budgeted, _ = _score(dag, fake_machine, xtalk_prop, num_starts=8, time_budget=0, max_workers=1,
+                         layout_cache=LayoutCache())
+
+    assert budgeted.crosstalk_edges == greedy.crosstalk_edges != []
+    assert (budgeted.available_hw_qubits.mask == greedy.available_hw_qubits.mask).all()
+    assert (budgeted.cx_reliabs == greedy.cx_reliabs).all()
+
+
+def test_time_budget_terminates_running_variants(batch_dag, fake_machine, monkeypatch):
+    place_programs = CrosstalkAdaptiveState._place_programs
+
+    def slow_variants(self, seed_rank=0, noise_seed=None, **kwargs):
+        if noise_seed is not None:
+            time.sleep(60)
+        return place_programs(self, seed_rank, noise_seed, **kwargs)
+
+    # the workers are forked after the patch, so they run the slow variants too
+    monkeypatch.setattr(CrosstalkAdaptiveState, '_place_programs', slow_variants)
+    before = set(multiprocessing.active_children())
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, {(0, 1): {(2, 3): 2}}, num_starts=4,
+                                         time_budget=0.5, max_workers=2,
+                                         layout_cache=LayoutCache())
+
+    start = time.monotonic()
+    state = pass_.place(batch_dag((3, 2)))
+
+    assert time.monotonic() - start < 5
+    assert set(multiprocessing.active_children()) <= before
+    assert len(state.prog2hw) == 5
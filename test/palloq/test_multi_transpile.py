@@ -1,9 +1,9 @@
 from qiskit.transpiler import Layout
 from qiskit.converters import circuit_to_dag
-from qiskit.circuit import QuantumCircuit
+from qiskit.circuit import QuantumCircuit, QuantumRegister
 from qiskit.test.mock import *
 
-from palloq.compiler.multi_transpile import multi_transpile
+from palloq.compiler.multi_transpile import _compose_multidag, multi_transpile
 from test.utils.random_qc_generator import RandomCircuitGenerator
 from test.utils import get_IBM_backend
 
@@ -51,4 +51,26 @@ def test_layout():
     paris = get_IBM_backend('ibmq_paris')
     qc_multi = multi_transpile(circuit_list, backend=paris)
     print("layout: ", qc_multi._layout)
-    assert isinstance(qc_multi, QuantumCircuit)
\ No newline at end of file
+    assert isinstance(qc_multi, QuantumCircuit)
+
+
+def test_compose_multidag():
+    qc0 = QuantumCircuit(2, 1)
+    qc0.h(0)
+    qc0.measure(1, 0)
+    qc0.x(0).c_if(qc0.cregs[0], 1)
+    qc1 = QuantumCircuit(QuantumRegister(3, 'prog'))
+    qc1.cx(2, 0)
+
+    dag = _compose_multidag([qc0, qc1], 'batch')
+
+    assert dag.name == 'batch'
+    assert [qreg.size for qreg in dag.qregs.values()] == [2, 3]
+    assert 'prog' in dag.qregs
+    assert dag.count_ops() == {'h': 1, 'measure': 1, 'x': 1, 'cx': 1}
+    x = dag.named_nodes('x')[0]
+    assert x.condition == (list(dag.cregs.values())[0], 1)
+    cx = dag.named_nodes('cx')[0]
+    assert cx.qargs == [dag.qregs['prog'][2], dag.qregs['prog'][0]]
+    # the input circuits are left untouched
+    assert qc0.data[2][0].condition[0] is qc0.cregs[0]
@@ -0,0 +1,45 @@
+import pytest
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+from qiskit.transpiler import InstructionDurations, Layout
+
+from palloq.transpiler.passes import MultiALAPSchedule, MultiASAPSchedule
+from palloq.transpiler.passes.schedule.program_alignment import qubit_programs
+
+
+def _batch():
+    qr0 = QuantumRegister(2, 'short')
+    qr1 = QuantumRegister(2, 'long')
+    qc = QuantumCircuit(qr0, qr1)
+    qc.cx(qr0[0], qr0[1])
+    for _ in range(3):
+        qc.cx(qr1[0], qr1[1])
+    qc.barrier()
+    return circuit_to_dag(qc)
+
+
+@pytest.mark.parametrize('scheduler', [MultiALAPSchedule, MultiASAPSchedule])
+@pytest.mark.parametrize('alignment, start', [('start', 0), ('center', 1000), ('end', 2000)])
+def test_align_short_program(scheduler, alignment, start):
+    durations = InstructionDurations([('cx', None, 1000)])
+    pass_ = scheduler(durations, alignment=alignment)
+    scheduled = pass_.run(_batch(), time_unit='dt')
+    timeline = pass_.property_set['qubit_timeline']
+
+    assert scheduled.duration == 3000
+    assert timeline.intervals(0)[0].tolist() == [start, start + 1000]
+    assert timeline.intervals(2)[0].tolist() == [0, 1000, 2000, 3000]
+    # the barrier across both programs is split per program
+    assert len(scheduled.named_nodes('barrier')) == 2
+
+
+def test_qubit_programs_from_layout():
+    dag = _batch()
+    physical = QuantumRegister(4, 'q')
+    layout = Layout({dag.qubits[0]: 3, dag.qubits[1]: 2, dag.qubits[2]: 0, dag.qubits[3]: 1})
+    laid_out = circuit_to_dag(QuantumCircuit(physical))
+
+    assert qubit_programs(dag).tolist() == [0, 0, 1, 1]
+    programs = qubit_programs(laid_out, layout)
+    # physical 0 and 1 hold the long program, 2 and 3 the short one
+    assert programs[0] == programs[1] != programs[2] == programs[3]
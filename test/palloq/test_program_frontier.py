@@ -0,0 +1,21 @@
+from palloq.transpiler.passes.layout.program_frontier import ProgramEdgeFrontier
+
+
+def test_frontier_prefers_edges_touching_mapped_qubits():
+    # priority order as produced by the layout pass
+    frontier = ProgramEdgeFrontier([(0, 1), (2, 3), (1, 2), (3, 4)])
+    assert frontier.next_edge() == (0, 1)
+
+    frontier.mark_mapped(0)
+    frontier.mark_mapped(1)
+    assert len(frontier) == 3
+    # (2, 3) has higher priority but (1, 2) touches a mapped qubit
+    assert frontier.next_edge() == (1, 2)
+
+    frontier.mark_mapped(2)
+    assert frontier.next_edge() == (2, 3)
+    frontier.mark_mapped(3)
+    assert frontier.next_edge() == (3, 4)
+    frontier.mark_mapped(4)
+    assert len(frontier) == 0
+    assert frontier.next_edge() is None
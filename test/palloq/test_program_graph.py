@@ -0,0 +1,51 @@
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+
+from palloq.transpiler.passes.layout.program_graph import program_graphs
+
+
+def test_components_and_weights():
+    qr0 = QuantumRegister(2, 'qr0')
+    qr1 = QuantumRegister(3, 'qr1')
+    qr2 = QuantumRegister(1, 'qr2')
+    qc = QuantumCircuit(qr0, qr1, qr2)
+    qc.cx(qr0[0], qr0[1])
+    qc.cx(qr1[2], qr1[1])
+    qc.cx(qr1[1], qr1[2])
+    qc.cx(qr1[0], qr1[1])
+    qc.h(qr2[0])
+
+    graphs = program_graphs(circuit_to_dag(qc))
+
+    # qr1 has volume 3 * 3, qr0 has volume 1 * 2, qr2 has no two-qubit gate
+    assert [g.nodes.tolist() for g in graphs] == [[2, 3, 4], [0, 1]]
+    assert graphs[0].placement_order() == [(3, 4, 2), (2, 3, 1)]
+    assert sorted(graphs[0].neighbors(3)) == [2, 4]
+
+
+def test_equal_volumes_keep_gate_order():
+    qr0 = QuantumRegister(2, 'qr0')
+    qr1 = QuantumRegister(2, 'qr1')
+    qc = QuantumCircuit(qr0, qr1)
+    qc.cx(qr1[0], qr1[1])
+    qc.cx(qr0[0], qr0[1])
+
+    graphs = program_graphs(circuit_to_dag(qc))
+    assert [g.nodes.tolist() for g in graphs] == [[2, 3], [0, 1]]
+
+
+def test_fingerprint_ignores_position():
+    qr0 = QuantumRegister(3, 'qr0')
+    qr1 = QuantumRegister(3, 'qr1')
+    qc = QuantumCircuit(qr0, qr1)
+    for qr in (qr0, qr1):
+        qc.cx(qr[0], qr[1])
+        qc.cx(qr[1], qr[2])
+    qc.cx(qr1[1], qr1[2])
+
+    graphs = program_graphs(circuit_to_dag(qc))
+    assert graphs[0].fingerprint != graphs[1].fingerprint
+
+    qc.cx(qr0[1], qr0[2])
+    graphs = program_graphs(circuit_to_dag(qc))
+    assert graphs[0].fingerprint == graphs[1].fingerprint
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from palloq.transpiler.passes.layout.qubit_availability import QubitAvailability
+
+
+def test_membership_and_removal():
+    available = QubitAvailability(5, [0, 2, 3, 4])
+    assert len(available) == 4
+    assert 2 in available and 1 not in available
+
+    available.remove(0)
+    assert available.first() == 2
+    assert list(available) == [2, 3, 4]
+    with pytest.raises(ValueError):
+        available.remove(0)
+
+
+def test_edge_mask_and_snapshot():
+    available = QubitAvailability(4, range(4))
+    edges = np.array([[0, 1], [1, 2], [2, 3]])
+    state = available.snapshot()
+
+    available.remove(1)
+    assert available.edge_mask(edges).tolist() == [False, False, True]
+
+    available.restore(state)
+    assert len(available) == 4
+    assert available.edge_mask(edges).all()
@@ -0,0 +1,57 @@
+import numpy as np
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+from qiskit.transpiler import InstructionDurations
+
+from palloq.transpiler.passes import MultiALAPSchedule, MultiASAPSchedule
+from palloq.transpiler.passes.schedule.qubit_timeline import QubitTimeline
+
+
+def _schedule(scheduler):
+    qr = QuantumRegister(3, 'q')
+    qc = QuantumCircuit(qr)
+    qc.cx(qr[0], qr[1])
+    qc.cx(qr[0], qr[1])
+    qc.x(qr[2])
+    durations = InstructionDurations([('cx', None, 1000), ('x', None, 100)])
+    pass_ = scheduler(durations)
+    pass_.run(circuit_to_dag(qc), time_unit='dt')
+    return pass_.property_set['qubit_timeline']
+
+
+def test_timeline_intervals():
+    asap = _schedule(MultiASAPSchedule)
+    alap = _schedule(MultiALAPSchedule)
+
+    assert asap.duration == alap.duration == 2000
+    assert asap.intervals(0)[0].tolist() == [0, 1000]
+    assert asap.intervals(2)[0].tolist() == [0]
+    assert alap.intervals(2)[0].tolist() == [1900]
+    assert asap.nodes[asap.intervals(2)[2][0]].name == 'x'
+
+
+def test_timeline_overlapping():
+    timeline = _schedule(MultiASAPSchedule)
+
+    assert len(timeline.overlapping(1, 500, 1500)) == 2
+    assert len(timeline.overlapping(1, 1000, 1500)) == 1
+    assert len(timeline.overlapping(2, 100, 2000)) == 0
+
+
+def test_timeline_zero_duration_ties():
+    # node 0 runs on [100, 200) and node 1 takes no time at 100, given out of order
+    timeline = QubitTimeline(1, 200, [0, 0], [0, 1], [100, 100], [200, 100])
+
+    assert timeline.intervals(0)[1].tolist() == [100, 200]
+    assert timeline.overlapping(0, 150, 160).tolist() == [0]
+    assert timeline.overlapping(0, 50, 150).tolist() == [1, 0]
+
+
+def test_timeline_idle_gaps():
+    timeline = _schedule(MultiALAPSchedule)
+
+    qubits, starts, stops = timeline.idle_gaps()
+    assert qubits.tolist() == [2]
+    assert (starts.tolist(), stops.tolist()) == ([0], [1900])
+    assert len(timeline.idle_gaps(min_duration=1900)[0]) == 0
+    assert np.array_equal(timeline.idle_time(), [0, 0, 1900])
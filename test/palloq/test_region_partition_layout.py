@@ -0,0 +1,45 @@
+import numpy as np
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+
+from palloq.transpiler.passes.layout.layout_cache import LayoutCache
+from palloq.transpiler.passes.layout.region_partition_layout import (
+    RegionPartitionedMultiLayout,
+    grow_region,
+)
+
+
+def test_programs_get_separate_regions(fake_machine):
+    qr0 = QuantumRegister(3, 'qr0')
+    qr1 = QuantumRegister(2, 'qr1')
+    qc = QuantumCircuit(qr0, qr1)
+    qc.cx(qr0[0], qr0[1])
+    qc.cx(qr0[1], qr0[2])
+    qc.cx(qr1[0], qr1[1])
+    dag = circuit_to_dag(qc)
+
+    pass_ = RegionPartitionedMultiLayout(fake_machine, layout_cache=LayoutCache())
+    pass_.run(dag)
+    layout = pass_.property_set['layout']
+    first = sorted(layout[q] for q in qr0)
+    second = sorted(layout[q] for q in qr1)
+
+    assert first == [0, 1, 2]
+    # one free qubit between the two programs
+    assert second == [4, 5]
+
+
+def test_grow_region():
+    # line 0 - 1 - 2 - 3 with a weak link between 1 and 2
+    log_gate = np.full((4, 4), -np.inf)
+    for (q0, q1), value in {(0, 1): -0.1, (1, 2): -0.5, (2, 3): -0.2}.items():
+        log_gate[q0, q1] = log_gate[q1, q0] = value
+    free = np.ones(4, dtype=bool)
+    blocked = np.zeros(4, dtype=bool)
+
+    region, score, apart = grow_region(log_gate, free, blocked, 1, 3)
+    assert region.tolist() == [True, True, True, False]
+    assert np.isclose(score, -0.6) and apart
+
+    free[2] = False
+    assert grow_region(log_gate, free, blocked, 1, 3) is None
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+from qiskit.transpiler import InstructionDurations
+
+from palloq.transpiler.passes import MultiALAPSchedule, MultiASAPSchedule
+from palloq.transpiler.passes.schedule.schedule_array import NO_QUBIT, program_makespans
+
+
+def _batch():
+    qr0 = QuantumRegister(2, 'short')
+    qr1 = QuantumRegister(2, 'long')
+    qc = QuantumCircuit(qr0, qr1)
+    qc.x(qr0[0])
+    for _ in range(3):
+        qc.cx(qr1[0], qr1[1])
+    qc.barrier()
+    return circuit_to_dag(qc)
+
+
+@pytest.mark.parametrize('scheduler, x_start', [(MultiALAPSchedule, 2950), (MultiASAPSchedule, 0)])
+def test_schedule_array(scheduler, x_start):
+    durations = InstructionDurations([('cx', None, 1000), ('x', None, 50)])
+    pass_ = scheduler(durations)
+    pass_.run(_batch(), time_unit='dt')
+    schedule = pass_.property_set['schedule_array']
+
+    # the barrier is left out
+    assert len(schedule) == 4
+    assert schedule.dtype['start'] == np.int64
+    x = schedule[schedule['kind'] == 'x'][0]
+    assert (x['program'], x['start'], x['duration']) == (0, x_start, 50)
+    assert x['qubits'].tolist() == [0, NO_QUBIT]
+    cx = schedule[schedule['kind'] == 'cx']
+    assert cx['program'].tolist() == [1, 1, 1]
+    assert sorted(cx['start'].tolist()) == [0, 1000, 2000]
+    assert (cx['qubits'] == [2, 3]).all()
+
+    starts, stops = program_makespans(schedule)
+    assert (stops - starts).tolist() == [50, 3000]
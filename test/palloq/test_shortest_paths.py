@@ -0,0 +1,41 @@
+import math
+import random
+
+import networkx as nx
+import numpy as np
+
+from palloq.transpiler.passes.layout.shortest_paths import floyd_warshall
+
+
+def _ring_weights(n, seed):
+    random.seed(seed)
+    weights = np.full((n, n), math.inf)
+    for i in range(n):
+        for j in [(i + 1) % n] + ([(i + n // 2) % n] if i % 3 == 0 else []):
+            w = random.uniform(0.01, 1.0)
+            weights[i, j] = w
+            weights[j, i] = w
+    return weights
+
+
+def _expected_dist(weights):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(weights.shape[0]))
+    for u, v in zip(*np.nonzero(np.isfinite(weights))):
+        graph.add_edge(u, v, weight=weights[u, v])
+    _, dist = nx.floyd_warshall_predecessor_and_distance(graph, weight="weight")
+    return np.array([[dist[s][t] for t in graph] for s in graph])
+
+
+def test_floyd_warshall():
+    weights = _ring_weights(10, seed=3)
+    pred, dist = floyd_warshall(weights)
+    assert np.allclose(dist, _expected_dist(weights))
+    # walking the predecessors back from t reproduces the distance
+    for s in range(10):
+        for t in range(10):
+            length, node = 0.0, t
+            while node != s:
+                length += weights[pred[s, node], node]
+                node = pred[s, node]
+            assert math.isclose(length, dist[s, t])
@@ -0,0 +1,56 @@
+import networkx as nx
+from qiskit.circuit import QuantumCircuit, QuantumRegister
+from qiskit.converters import circuit_to_dag
+
+from palloq.transpiler.passes.layout.crosstalk_adaptive_layout import (
+    CrosstalkAdaptiveMultiLayout,
+    _subgraph_monomorphisms,
+)
+from palloq.transpiler.passes.layout.layout_cache import LayoutCache
+
+
+def _physical(fake_machine, qc, **kwargs):
+    dag = circuit_to_dag(qc)
+    pass_ = CrosstalkAdaptiveMultiLayout(fake_machine, layout_cache=LayoutCache(), **kwargs)
+    pass_.run(dag)
+    layout = pass_.property_set['layout']
+    return [layout[q] for q in dag.qubits]
+
+
+def _line():
+    qr = QuantumRegister(4, 'qr')
+    qc = QuantumCircuit(qr)
+    qc.cx(qr[0], qr[1])
+    qc.cx(qr[1], qr[2])
+    for _ in range(3):
+        qc.cx(qr[2], qr[3])
+    return qc
+
+
+def test_embedding_needs_no_swap(fake_machine):
+    greedy = _physical(fake_machine, _line())
+    embedded = _physical(fake_machine, _line(), vf2_max_qubits=5)
+
+    assert any(abs(greedy[i] - greedy[i + 1]) != 1 for i in range(3))
+    assert all(abs(embedded[i] - embedded[i + 1]) == 1 for i in range(3))
+
+
+def test_falls_back_to_greedy(fake_machine):
+    # a star does not fit the line coupling map of the fake machine
+    qr = QuantumRegister(4, 'qr')
+    qc = QuantumCircuit(qr)
+    for leaf in range(1, 4):
+        qc.cx(qr[0], qr[leaf])
+
+    assert _physical(fake_machine, qc, vf2_max_qubits=5) == _physical(fake_machine, qc)
+
+
+def test_call_limit_bounds_a_search_without_embedding():
+    # a grid is bipartite, so an odd cycle never embeds
+    grid = nx.convert_node_labels_to_integers(nx.grid_2d_graph(8, 8))
+    triangle = nx.cycle_graph(3)
+    path = nx.path_graph(3)
+
+    assert list(_subgraph_monomorphisms(grid, triangle, call_limit=1000)) == []
+    assert len(list(_subgraph_monomorphisms(grid, path, call_limit=50))) < \
+        len(list(_subgraph_monomorphisms(grid, path)))